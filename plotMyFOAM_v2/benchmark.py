@@ -0,0 +1,421 @@
+import io
+import os
+import sys
+import json
+import time
+import platform
+import traceback
+import argparse
+import tempfile
+import subprocess
+import contextlib
+
+import numpy as np
+import pandas as pd
+
+from foamData import Line, CaseIndex, ParseCache, read_header
+
+
+# Write a synthetic postProcessing/<folder>/<time>/<field> tree with one file per time directory (restarts)
+# Besides the scalar <columns>, every row holds <vectors> parenthesized (x y z) groups
+def make_case(root, times, rows, columns, folder='forces', field='force.dat', vectors=0):
+    maindir = os.path.join(root, 'postProcessing')
+    timeNames = []
+    for x in range(times):
+        timeName = str(x * rows)
+        os.makedirs(os.path.join(maindir, folder, timeName), exist_ok=True)
+        data = np.random.rand(rows, columns + 3 * vectors + 1)
+        data[:, 0] = np.arange(x * rows, (x + 1) * rows)
+        with open(os.path.join(maindir, folder, timeName, field), 'w') as f:
+            f.write('# Forces\n# CofR : (0 0 0)\n#\n')
+            f.write('# Time' + ''.join('\tcolumn_' + str(y) for y in range(columns)) +
+                    ''.join('\tvector_' + str(y) for y in range(vectors)) + '\n')
+            fmt = ['%.8e'] * (columns + 1) + ['(%.8e', '%.8e', '%.8e)'] * vectors
+            np.savetxt(f, data, fmt=fmt, delimiter='\t')
+        timeNames.append(timeName)
+    return maindir, folder, field, timeNames
+
+
+# Write a synthetic postProcessing tree of <functions> function objects (folders forces_0, forces_1, ...)
+# Return the main directory and the (folder, field, timeNames) of every function object
+def make_tree(root, functions, times, rows, columns, vectors=0):
+    lines = []
+    for x in range(functions):
+        maindir, folder, field, timeNames = make_case(root, times, rows, columns, 'forces_' + str(x), vectors=vectors)
+        lines.append((folder, field, timeNames))
+    return maindir, lines
+
+
+# Append <rows> rows to a data file, as a running solver does, starting at time <start>
+def append_rows(path, start, rows, columns, vectors=0):
+    data = np.random.rand(rows, columns + 3 * vectors + 1)
+    data[:, 0] = np.arange(start, start + rows)
+    fmt = ['%.8e'] * (columns + 1) + ['(%.8e', '%.8e', '%.8e)'] * vectors
+    with open(path, 'a') as f:
+        np.savetxt(f, data, fmt=fmt, delimiter='\t')
+    return start + rows
+
+
+# Best of <repeat> wall times of reading a Line with the given number of read threads
+# The parse cache is disabled, so that every run parses all the files (and no entry is left in the user cache)
+def time_load(maindir, folder, field, timeNames, threads, repeat):
+    Line.readThreads = threads
+    cache, Line.cache = Line.cache, None
+    best = float('inf')
+    try:
+        for x in range(repeat):
+            start = time.perf_counter()
+            Line(maindir, folder, field, timeNames)
+            best = min(best, time.perf_counter() - start)
+    finally:
+        Line.cache = cache
+    return best
+
+
+# The pandas path Line.read_data used before the dedicated parser (header sniffing, read_table and fillna)
+def pandas_read(path):
+    rows2skip = int(pd.read_table(path, sep=r"\s+", usecols=[0], nrows=50, index_col=False).value_counts()['#'])
+    header = pd.read_table(path, sep=r"\s+", nrows=0, skiprows=rows2skip).columns[1:]
+    return pd.read_table(path, sep=r"\s+", header=rows2skip, usecols=range(len(header)), names=header).fillna(0)
+
+
+def foam_read(path):
+    return Line.read_file(path, read_header(path))
+
+
+def best_time(function, path, repeat):
+    best = float('inf')
+    for x in range(repeat):
+        start = time.perf_counter()
+        function(path)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+# Wall times of <repeat> calls of <function>, whose own timing prints are discarded
+def measure(function, repeat, setup=None):
+    samples = []
+    for x in range(repeat):
+        if setup is not None:
+            setup()
+        with contextlib.redirect_stdout(io.StringIO()):
+            start = time.perf_counter()
+            function()
+            samples.append(time.perf_counter() - start)
+    return {'best': min(samples), 'mean': float(np.mean(samples)), 'worst': max(samples), 'repeat': repeat}
+
+
+# An offscreen plotMyFOAM Widget (Qt and the GUI module are only imported when the plot benchmarks run)
+# It is never shown, so its figure is set up at once instead of after the first paint
+def offscreen_widget():
+    os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+    from PyQt5.QtWidgets import QApplication
+    app = QApplication.instance() or QApplication([])
+    with contextlib.redirect_stdout(io.StringIO()):
+        import plotMyFOAM
+        widget = plotMyFOAM.Widget()
+        widget.setup_plot()
+    return app, widget
+
+
+# Child process of the startup benchmark: start plotMyFOAM like its command line does and print the times (from
+# <argv[1]>, the time.time() of the parent before the process was spawned) of the first paint of the window and of
+# the end of the figure setup
+STARTUP = '''
+import sys
+import time
+start = float(sys.argv[1])
+import plotMyFOAM
+from PyQt5.QtWidgets import QApplication
+from PyQt5.QtCore import QTimer
+times = {}
+
+
+class Widget(plotMyFOAM.Widget):
+    def paintEvent(self, event):
+        super().paintEvent(event)
+        times.setdefault('first_window', time.time() - start)
+
+    def setup_plot(self):
+        super().setup_plot()
+        times.setdefault('ready', time.time() - start)
+        QTimer.singleShot(0, app.quit)
+
+
+app = QApplication([])
+widget = Widget()
+widget.show()
+app.exec()
+print(times['first_window'], times['ready'])
+'''
+
+
+# Time to the first window and to the ready figure of <repeat> fresh processes (interpreter startup and imports
+# included, which is what a user waits for)
+def startup_times(repeat):
+    samples = []
+    env = dict(os.environ, QT_QPA_PLATFORM=os.environ.get('QT_QPA_PLATFORM', 'offscreen'))
+    for x in range(repeat):
+        start = time.time()
+        output = subprocess.run([sys.executable, '-c', STARTUP, repr(start)], cwd=os.path.dirname(os.path.abspath(
+            __file__)), env=env, capture_output=True, text=True, check=True).stdout
+        samples.append([float(y) for y in output.split()[-2:]])
+    return [{'best': min(y), 'mean': float(np.mean(y)), 'worst': max(y), 'repeat': repeat} for y in zip(*samples)]
+
+
+def commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', 'HEAD'], cwd=os.path.dirname(os.path.abspath(__file__)),
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def suite_benchmark(args):
+    results = {}
+    with tempfile.TemporaryDirectory() as root:
+        maindir, specs = make_tree(root, args.functions, args.times, args.rows, args.columns, args.vectors)
+        columns = read_header(os.path.join(maindir, specs[0][0], specs[0][2][0], specs[0][1]))[1:]
+
+        # Index the postProcessing tree and the times of every field
+        def scan():
+            index = CaseIndex(maindir)
+            [index.times(x, y) for x in index.folders() for y in index.fields(x)]
+        results['scan'] = measure(scan, args.repeat)
+
+        # Read every function object with all its columns, without and with the parse cache of the finished files
+        def read():
+            return [Line(maindir, folder, field, timeNames, columns=columns) for folder, field, timeNames in specs]
+        cache = Line.cache
+        Line.cache = None
+        results['read_data'] = measure(read, args.repeat)
+        Line.cache = ParseCache(os.path.join(root, 'cache'))
+        with contextlib.redirect_stdout(io.StringIO()):
+            lines = read()
+        results['read_data_cached'] = measure(read, args.repeat)
+        results['memory'] = {'bytes': sum(x.data.nbytes for x in lines), 'rows': sum(len(x.data) for x in lines)}
+
+        # Parse the rows a solver appended to the last file of every function object
+        ends = [int(x.data.column(x.header[0])[-1]) + 1 for x in lines]
+
+        def append():
+            for x, line in enumerate(lines):
+                ends[x] = append_rows(line.fileList[-1], ends[x], args.append, args.columns, args.vectors)
+        results['re_read_data'] = measure(lambda: [x.re_read_data() for x in lines], args.repeat, append)
+
+        if not args.no_plot:
+            # Launch the application in fresh processes, a slower first window is a regression like a slower read
+            results['first_window'], results['ready'] = startup_times(args.repeat)
+
+            # Redraw one column of every function object on an offscreen canvas
+            app, widget = offscreen_widget()
+            widget.line = lines
+            for line in lines:
+                line.reset_plottedColumns()
+                line.is_plotted(1, 1)
+
+            def touch():
+                for line in lines:
+                    line.generation += 1
+            results['re_plot_data'] = measure(widget.re_plot_data, args.repeat, touch)
+
+            # The refresh a running solver causes: append, parse the tails and redraw, step after step
+            results['solver_loop'] = measure(lambda: ([x.re_read_data() for x in lines], widget.re_plot_data()),
+                                             args.steps, append)
+        Line.cache = cache
+
+    report = {'commit': commit(), 'python': platform.python_version(), 'numpy': np.__version__,
+              'machine': platform.machine(), 'cpus': os.cpu_count(),
+              'parameters': {x: y for x, y in vars(args).items() if x not in ('function', 'output')},
+              'results': results}
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(text + '\n')
+    else:
+        print(text)
+
+
+# Compare the best times of two suite reports, a ratio above <threshold> is reported as a regression
+def compare_benchmark(args):
+    with open(args.baseline) as f:
+        old = json.load(f)['results']
+    with open(args.current) as f:
+        new = json.load(f)['results']
+    regressions = 0
+    print('%-18s %12s %12s %8s' % ('benchmark', 'baseline', 'current', 'ratio'))
+    for name in [x for x in old if x in new and 'best' in old[x]]:
+        ratio = new[name]['best'] / old[name]['best']
+        flag = '  REGRESSION' if ratio > args.threshold else ''
+        regressions += bool(flag)
+        print('%-18s %11.4fs %11.4fs %7.2fx%s' % (name, old[name]['best'], new[name]['best'], ratio, flag))
+    sys.exit(1 if regressions else 0)
+
+
+def threads_benchmark(args):
+    print('times  ' + ''.join('%12s' % ('threads=' + str(x)) for x in args.threads))
+    for times in args.times:
+        with tempfile.TemporaryDirectory() as root:
+            case = make_case(root, times, args.rows, args.columns)
+            result = [time_load(*case, threads, args.repeat) for threads in args.threads]
+        print('%5d  ' % times + ''.join('%11.3fs' % x for x in result))
+
+
+def parser_benchmark(args):
+    print('vectors        MB      pandas     foamData    speedup')
+    for vectors in args.vectors:
+        with tempfile.TemporaryDirectory() as root:
+            maindir, folder, field, timeNames = make_case(root, 1, args.rows, args.columns, vectors=vectors)
+            path = os.path.join(maindir, folder, timeNames[0], field)
+            size = os.path.getsize(path) / 1024 ** 2
+            old = best_time(pandas_read, path, args.repeat)
+            new = best_time(foam_read, path, args.repeat)
+        print('%7d  %8.1f  %9.3fs  %10.3fs  %8.2fx' % (vectors, size, old, new, old / new))
+
+
+# Frames per second and refresh latency of every rendering backend, drawing <series> lines of <points> points on an
+# offscreen widget of the size of the plot: a frame replaces the data of all the lines and draws them (every plotted
+# line refreshing at once), a refresh replaces the data of one line and draws
+def render_benchmark(args):
+    os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+    from PyQt5.QtWidgets import QApplication
+    from foamRender import RENDERERS
+    app = QApplication.instance() or QApplication([])
+    x = np.arange(args.points, dtype=np.float64)
+    print('backend       series    points       fps   frame     refresh')
+    for name in args.backends:
+        for series in args.series:
+            renderer = RENDERERS[name]()
+            renderer.widget.resize(1536, 512)
+            renderer.widget.show()
+            app.processEvents()
+            # Two states of the data, swapped outside of the timed calls
+            data = [np.random.rand(series, args.points).cumsum(axis=1) for _ in range(2)]
+            handles = [renderer.plot(x, y) for y in data[0]]
+            renderer.draw(layout=True)
+            step = [0]
+
+            def swap():
+                step[0] = 1 - step[0]
+
+            def frame():
+                for handle, y in zip(handles, data[step[0]]):
+                    renderer.set_data(handle, x, y)
+                renderer.draw()
+
+            def refresh():
+                renderer.set_data(handles[0], x, data[step[0]][0])
+                renderer.draw()
+            frames = measure(frame, args.frames, swap)
+            refreshes = measure(refresh, args.frames, swap)
+            print('%-10s  %8d  %8d  %8.1f  %5.1fms  %7.1fms' % (name, series, args.points, 1 / frames['mean'],
+                                                              1000 * frames['mean'], 1000 * refreshes['mean']))
+            renderer.widget.close()
+
+
+# Use an offscreen widget like a user: plot a column of a synthetic case, refresh it with the Update button (with the
+# automatic refresher off) once rows were appended, and clear it with the Clear button. Exceptions raised in the slots
+# (which abort PyQt) are collected and fail the check
+def smoke_check(args):
+    errors = []
+    sys.excepthook = lambda kind, value, trace: errors.append(''.join(traceback.format_exception(kind, value, trace)))
+    cache = Line.cache
+    with tempfile.TemporaryDirectory() as root:
+        Line.cache = ParseCache(os.path.join(root, 'cache'))
+        try:
+            maindir, folder, field, timeNames = make_case(root, 2, args.rows, 3)
+            app, widget = offscreen_widget()
+
+            # Process the events until <condition>() holds, or fail after <timeout> seconds
+            def wait(condition, what, timeout=10):
+                start = time.perf_counter()
+                while not condition() and not errors:
+                    if time.perf_counter() - start > timeout:
+                        errors.append('timed out waiting for ' + what)
+                    app.processEvents()
+                    time.sleep(0.01)
+                if errors:
+                    raise SystemExit('smoke check failed:\n' + '\n'.join(errors))
+
+            with contextlib.redirect_stdout(io.StringIO()):
+                widget.checkBox.setChecked(False)
+                widget.case_dict['case'] = maindir
+                widget.caseCombo.addItem('case')
+                widget.case_changed('case')
+                widget.folder_changed(folder)
+                widget.field_changed(field)
+                wait(lambda: not widget.workers, 'the field')
+                widget.column_changed('column_0')
+                wait(lambda: not widget.workers and widget.artists, 'the plot')
+                line = widget.line_x
+                rows = len(line.data)
+                append_rows(line.fileList[-1], len(timeNames) * args.rows, 10, 3)
+                wait(lambda: widget.updatePlotButton.isEnabled(), 'the modification')
+                widget.updatePlotButton.click()
+                wait(lambda: not widget.workers and len(line.data) == rows + 10, 'the refresh')
+                widget.clearPlotButton.click()
+                wait(lambda: not widget.artists, 'the clear')
+            print('smoke check passed')
+        finally:
+            Line.cache = cache
+
+
+def main():
+    parser = argparse.ArgumentParser(description='plotMyFOAM reading benchmarks on synthetic postProcessing data')
+    subparsers = parser.add_subparsers(dest='benchmark', required=True)
+
+    threads = subparsers.add_parser('threads', help='how Line.read_data scales with the number of time directories')
+    threads.add_argument('--times', type=int, nargs='+', default=[1, 4, 16, 64],
+                         help='number of time directories (restarts) of each synthetic case')
+    threads.add_argument('--rows', type=int, default=20000, help='rows per time file')
+    threads.add_argument('--columns', type=int, default=9, help='data columns per time file (besides Time)')
+    threads.add_argument('--threads', type=int, nargs='+', default=[1, 2, 4, 8], help='read thread counts to compare')
+    threads.add_argument('--repeat', type=int, default=3, help='repetitions per measurement (best is kept)')
+    threads.set_defaults(function=threads_benchmark)
+
+    parser_ = subparsers.add_parser('parser', help='the OpenFOAM .dat parser against the previous pandas path')
+    parser_.add_argument('--rows', type=int, default=200000, help='rows of the synthetic file')
+    parser_.add_argument('--columns', type=int, default=6, help='scalar columns (besides Time)')
+    parser_.add_argument('--vectors', type=int, nargs='+', default=[0, 3],
+                         help='numbers of parenthesized vector groups to compare')
+    parser_.add_argument('--repeat', type=int, default=3, help='repetitions per measurement (best is kept)')
+    parser_.set_defaults(function=parser_benchmark)
+
+    render = subparsers.add_parser('render', help='frames per second and refresh latency of the rendering backends')
+    render.add_argument('--backends', nargs='+', default=['matplotlib', 'pyqtgraph'], help='backends to compare')
+    render.add_argument('--series', type=int, nargs='+', default=[1, 10, 50], help='numbers of lines to draw')
+    render.add_argument('--points', type=int, default=3000,
+                        help='points per line (the decimated size of a line on a 1536 pixel wide plot)')
+    render.add_argument('--frames', type=int, default=20, help='frames (and refreshes) per measurement')
+    render.set_defaults(function=render_benchmark)
+
+    suite = subparsers.add_parser('suite', help='read, re_read, scan and plot timings as a JSON report')
+    suite.add_argument('--functions', type=int, default=4, help='number of function objects (folders)')
+    suite.add_argument('--times', type=int, default=4, help='time directories (restarts) per function object')
+    suite.add_argument('--rows', type=int, default=50000, help='rows per time file')
+    suite.add_argument('--columns', type=int, default=6, help='scalar columns per time file (besides Time)')
+    suite.add_argument('--vectors', type=int, default=1, help='parenthesized vector groups per row')
+    suite.add_argument('--append', type=int, default=100, help='rows the solver appends to every file per step')
+    suite.add_argument('--steps', type=int, default=20, help='steps of the simulated solver loop')
+    suite.add_argument('--repeat', type=int, default=5, help='repetitions per measurement')
+    suite.add_argument('--no-plot', action='store_true', help='skip the benchmarks which need Qt')
+    suite.add_argument('--output', help='write the JSON report to this file instead of the standard output')
+    suite.set_defaults(function=suite_benchmark)
+
+    smoke = subparsers.add_parser('smoke', help='click the buttons of an offscreen window plotting a synthetic case')
+    smoke.add_argument('--rows', type=int, default=1000, help='rows per time file')
+    smoke.set_defaults(function=smoke_check)
+
+    compare = subparsers.add_parser('compare', help='compare two suite reports (e.g. of two commits)')
+    compare.add_argument('baseline', help='JSON report of the reference')
+    compare.add_argument('current', help='JSON report to check')
+    compare.add_argument('--threshold', type=float, default=1.1,
+                         help='ratio of the best times above which a benchmark regressed (default: %(default)s)')
+    compare.set_defaults(function=compare_benchmark)
+
+    args = parser.parse_args()
+    args.function(args)
+
+
+if __name__ == '__main__':
+    main()
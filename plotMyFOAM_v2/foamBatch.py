@@ -0,0 +1,111 @@
+import os
+import sys
+import time
+import fnmatch
+import argparse
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+
+# Only the Figure class is used (never pyplot), so no GUI backend and no Qt is ever imported
+from matplotlib.figure import Figure
+
+from foamData import Line, CaseIndex, decimate, read_header, data_path
+
+
+# Render every selected (folder, field) of a case into one image holding the selected columns
+# Return the written image paths and the error messages, so that one bad field does not stop the batch
+def render_case(case, args):
+    images, errors = [], []
+    maindir = os.path.join(case, 'postProcessing')
+    if not os.path.isdir(maindir):
+        return images, [case + ': the directory does not CONTAIN a "postProcessing" folder']
+    name = os.path.basename(os.path.normpath(case))
+    index = CaseIndex(maindir)
+    for folder in [x for x in index.folders() if any(fnmatch.fnmatch(x, y) for y in args.folder)]:
+        for field in [x for x in index.fields(folder) if any(fnmatch.fnmatch(x, y) for y in args.field)]:
+            try:
+                times = index.times(folder, field)
+                # Select the columns from the header of the first file, so that only those are loaded
+                header = read_header(data_path(os.path.join(maindir, folder, times[0]), field))
+                columns = [x for x in header[1:] if any(fnmatch.fnmatch(x, y) for y in args.column)]
+                if not columns:
+                    continue
+                line = Line(maindir, folder, field, times, columns=columns)
+                fig = Figure(figsize=(args.width / args.dpi, args.height / args.dpi), dpi=args.dpi)
+                ax = fig.add_subplot()
+                # Decimate to the width of the image, peaks and spikes are kept
+                for column in columns:
+                    ax.plot(*decimate(line.data.column(line.header[0]), line.data.column(column), pixels=args.width),
+                            label=column, linewidth=0.8)
+                ax.set_title(name + ' - ' + folder + ' - ' + field)
+                ax.set_xlabel(line.header[0])
+                ax.set_yscale(args.yscale)
+                ax.grid(True)
+                ax.margins(x=0)
+                if len(columns) > 1:
+                    ax.legend(fontsize='small')
+                fig.tight_layout()
+                image = os.path.join(args.output, '_'.join([name, folder, field]).replace(os.sep, '_') +
+                                     '.' + args.format)
+                fig.savefig(image, format=args.format)
+                images.append(image)
+            except Exception as error:
+                errors.append(os.path.join(maindir, folder, field) + ': ' + repr(error))
+    return images, errors
+
+
+# Set the reader options of a worker process
+def init_worker(threads, cacheSize, dtype):
+    Line.readThreads = threads
+    Line.dtype = np.dtype(dtype)
+    if cacheSize == 0:
+        Line.cache = None
+    else:
+        Line.cache.maxBytes = int(cacheSize * 1024 ** 2)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Render OpenFOAM postProcessing plots of many cases without a display')
+    parser.add_argument('cases', nargs='+', help='case directories (holding a postProcessing folder)')
+    parser.add_argument('--folder', nargs='+', default=['*'], help='function object folder names or patterns')
+    parser.add_argument('--field', nargs='+', default=['*'], help='field file names or patterns')
+    parser.add_argument('--column', nargs='+', default=['*'], help='column names or patterns (Time is the x axis)')
+    parser.add_argument('--output', default='.', help='directory of the images (default: current directory)')
+    parser.add_argument('--format', choices=['png', 'svg'], default='png', help='image format (default: png)')
+    parser.add_argument('--width', type=int, default=1536, help='image width in pixels (default: %(default)s)')
+    parser.add_argument('--height', type=int, default=512, help='image height in pixels (default: %(default)s)')
+    parser.add_argument('--dpi', type=int, default=100, help='image resolution (default: %(default)s)')
+    parser.add_argument('--yscale', choices=['linear', 'log'], default='linear', help='y axis scale')
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1,
+                        help='number of cases rendered in parallel processes (default: %(default)s)')
+    parser.add_argument('--threads', type=int, default=1, help='read threads per worker process (default: 1)')
+    parser.add_argument('--cache-size', type=float, default=1024,
+                        help='size limit of the parsed data cache in MB, 0 disables it (default: %(default)s)')
+    parser.add_argument('--dtype', choices=['float32', 'float64'], default='float64',
+                        help='storage type of the data columns, float32 halves the memory (default: %(default)s)')
+    args = parser.parse_args(argv)
+
+    os.makedirs(args.output, exist_ok=True)
+    start = time.time()
+    failed = False
+    # Spread the cases across a process pool
+    with ProcessPoolExecutor(max_workers=max(1, args.workers), initializer=init_worker,
+                             initargs=(args.threads, args.cache_size, args.dtype)) as executor:
+        futures = {executor.submit(render_case, case, args): case for case in args.cases}
+        for future in as_completed(futures):
+            try:
+                images, errors = future.result()
+            except Exception as error:
+                images, errors = [], [futures[future] + ': ' + repr(error)]
+            for image in images:
+                print(image)
+            for error in errors:
+                print('\n_error_#04: ' + error + '\n', file=sys.stderr)
+            failed = failed or bool(errors)
+    print('Rendered ' + str(len(args.cases)) + ' cases in ' + str(time.time() - start) + ' s')
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
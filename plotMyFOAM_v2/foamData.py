@@ -0,0 +1,969 @@
+import os
+import re
+import gzip
+import lzma
+import json
+import shutil
+import hashlib
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import numpy as np
+
+import foamTrace
+
+
+# Growable column-major table: one preallocated NumPy array per column, whose capacity doubles when it is full
+# Appends are amortized O(1) per row and column() returns a view of the valid rows without copying
+# <dtypes> optionally overrides <dtype> for some columns (e.g. keeps the time column in float64)
+class ColumnStore:
+    def __init__(self, columns, capacity=1024, dtype=np.float64, dtypes=None):
+        self.columns = list(columns)
+        self.dtype = np.dtype(dtype)
+        self.length = 0
+        dtypes = dtypes or {}
+        self.arrays = {x: np.empty(max(1, capacity), dtypes.get(x, self.dtype)) for x in self.columns}
+
+    def __len__(self):
+        return self.length
+
+    @property
+    def capacity(self):
+        return len(next(iter(self.arrays.values()))) if self.arrays else 0
+
+    # Memory held by the column arrays (including the unused capacity)
+    @property
+    def nbytes(self):
+        return sum(x.nbytes for x in self.arrays.values())
+
+    # Append the rows of <block>, a DataFrame or a dictionary of equally long arrays keyed by column name
+    def append(self, block):
+        rows = len(block[self.columns[0]]) if self.columns else 0
+        if rows == 0:
+            return
+        if self.length + rows > self.capacity:
+            self.reserve(max(2 * self.capacity, self.length + rows))
+        for x in self.columns:
+            self.arrays[x][self.length:self.length + rows] = np.asarray(block[x])
+        self.length += rows
+
+    # Append a segment sorted by column <key> (e.g. the time of a restart), which supersedes the stored rows from its
+    # first key on. The stored key column stays monotonic, so the cut point is found by binary search
+    def merge(self, block, key):
+        values = np.asarray(block[key])
+        if len(values) and self.length and values[0] <= self.arrays[key][self.length - 1]:
+            self.length = int(np.searchsorted(self.column(key), values[0], side='left'))
+        self.append(block)
+
+    # Rows whose (monotonic) column <key> lies between <low> and <high>, found by binary search
+    def between(self, key, low=-np.inf, high=np.inf):
+        column = self.column(key)
+        return slice(int(np.searchsorted(column, low, side='left')), int(np.searchsorted(column, high, side='right')))
+
+    # Grow every column array to hold at least <capacity> rows
+    def reserve(self, capacity):
+        for x in self.columns:
+            array = np.empty(capacity, self.arrays[x].dtype)
+            array[:self.length] = self.arrays[x][:self.length]
+            self.arrays[x] = array
+
+    # Remove columns and free their arrays
+    def drop(self, names):
+        for x in names:
+            if x in self.arrays:
+                self.columns.remove(x)
+                del self.arrays[x]
+
+    # View (not a copy) of the valid rows of a column, only valid until the next append
+    def column(self, name):
+        return self.arrays[name][:self.length]
+
+    # Build a DataFrame copy of the stored rows (or of a slice of them), only when a caller explicitly needs one
+    # (pandas is imported then, it would double the import time of the module)
+    def to_frame(self, rows=slice(None)):
+        import pandas as pd
+        return pd.DataFrame({x: self.column(x)[rows].copy() for x in self.columns}, columns=self.columns)
+
+
+# Column-major (columns, rows) array in an anonymous temporary file, memory-mapped so that only the pages of the
+# columns read are loaded into memory: the time files of wide Lines which are not in the parse cache (the growing one,
+# or all of them when the cache is disabled or full). The rows appended to the growing file are written after its
+# rows, the capacity doubles when it is full (like a ColumnStore), and write returns a view of the valid rows
+class MappedArray:
+    # Directory of the temporary files (None is the system one)
+    directory = None
+
+    def __init__(self, columns, capacity=1024, dtype=np.float64):
+        self.dtype = np.dtype(dtype)
+        self.array = self.allocate(columns, max(1, capacity))
+
+    def allocate(self, columns, capacity):
+        # The file is removed at once, the disk space is freed with the last mapping of it
+        with tempfile.TemporaryFile(dir=self.directory) as f:
+            return np.memmap(f, self.dtype, 'w+', shape=(columns, capacity))
+
+    # Write the (columns, rows) array <rows> after the first <start> rows, and return a view of the rows up to them
+    # (the rows after <start> of a discarded write are overwritten by the next one)
+    def write(self, start, rows):
+        end = start + rows.shape[1]
+        if end > self.array.shape[1]:
+            array = self.allocate(self.array.shape[0], max(2 * self.array.shape[1], end))
+            array[:, :start] = self.array[:, :start]
+            self.array = array
+        self.array[:, start:end] = rows
+        return self.array[:, :end]
+
+
+# On-disk cache of the parsed columns of finished time files, keyed by path, size and modification time
+# Every entry is a column-major <key>.npy array plus a <key>.json description, the least recently used are evicted
+# once the cache grows beyond <maxBytes>
+class ParseCache:
+    def __init__(self, directory=None, maxBytes=1024 ** 3):
+        if directory is None:
+            directory = os.path.join(os.environ.get('XDG_CACHE_HOME', os.path.expanduser('~/.cache')), 'plotMyFOAM')
+        self.directory = directory
+        self.maxBytes = maxBytes
+        self.lock = threading.Lock()
+
+    @staticmethod
+    def key(path, stat):
+        return hashlib.sha1(('%s\0%d\0%d' % (os.path.abspath(path), stat.st_size, stat.st_mtime_ns)).encode()).hexdigest()
+
+    # Return the (description, memory-mapped columns) of a cached file, or None when it is not cached
+    def get(self, path, stat):
+        name = os.path.join(self.directory, self.key(path, stat))
+        try:
+            with open(name + '.json') as f:
+                info = json.load(f)
+            array = np.load(name + '.npy', mmap_mode='r')
+            # Mark the entry as recently used
+            os.utime(name + '.npy')
+        except (OSError, ValueError):
+            return None
+        return info, array
+
+    # Store the columns (array of shape (columns, rows)) parsed from a file
+    def put(self, path, stat, info, array):
+        name = os.path.join(self.directory, self.key(path, stat))
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            # Write to temporary files first, so that readers never see a partial entry
+            for suffix, write in [('.npy', lambda f: np.save(f, array)),
+                                  ('.json', lambda f: f.write(json.dumps(info).encode()))]:
+                handle, temporary = tempfile.mkstemp(dir=self.directory)
+                with os.fdopen(handle, 'wb') as f:
+                    write(f)
+                os.replace(temporary, name + suffix)
+        except OSError as error:
+            print('\n_error_#03: the parsed data could not be cached (' + str(error) + ')\n')
+            return False
+        self.evict()
+        return True
+
+    # Remove the least recently used entries until the cache fits in <maxBytes>
+    def evict(self):
+        with self.lock:
+            entries = []
+            for entry in os.scandir(self.directory):
+                # Other processes may share (and evict from) the same cache
+                try:
+                    if entry.name.endswith('.npy'):
+                        stat = entry.stat()
+                        entries.append((stat.st_mtime, stat.st_size, entry.path[:-4]))
+                except FileNotFoundError:
+                    pass
+            total = sum(x[1] for x in entries)
+            for mtime, size, name in sorted(entries):
+                if total <= self.maxBytes:
+                    break
+                for suffix in ['.npy', '.json']:
+                    try:
+                        os.remove(name + suffix)
+                    except FileNotFoundError:
+                        pass
+                total -= size
+
+    def clear(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+
+# Names of the components of vector (3), symmTensor (6) and tensor (9) values, other sizes are numbered
+COMPONENTS = {3: ['x', 'y', 'z'], 6: ['xx', 'xy', 'xz', 'yy', 'yz', 'zz'],
+              9: ['xx', 'xy', 'xz', 'yx', 'yy', 'yz', 'zx', 'zy', 'zz']}
+
+
+# Split a line into tokens, with parenthesized groups as nested lists: '0 (1 2 3)' -> ['0', ['1', '2', '3']]
+def nest(line):
+    stack = [[]]
+    for token in re.findall(rb'[()]|[^\s()]+', line):
+        if token == b'(':
+            stack.append([])
+        elif token == b')':
+            if len(stack) > 1:
+                group = stack.pop()
+                stack[-1].append(group)
+        else:
+            stack[-1].append(token.decode('latin-1'))
+    while len(stack) > 1:
+        group = stack.pop()
+        stack[-1].append(group)
+    return stack[0]
+
+
+def flatten(tokens):
+    return [y for x in tokens for y in (flatten(x) if isinstance(x, list) else [x])]
+
+
+# Name the columns of a (possibly nested) value: total, (1 2 3) -> total_x, total_y, total_z
+# A header group, e.g. forces(pressure viscous porous), names the items of the value
+def expand(name, value, labels=None):
+    if not isinstance(value, list):
+        return [name]
+    if labels is None or len(labels) != len(value):
+        labels = COMPONENTS.get(len(value), [str(x) for x in range(len(value))])
+    return [y for label, item in zip(labels, value) for y in expand(name + '_' + label, item)]
+
+
+# Detect the header of an OpenFOAM function object file in one pass over its first bytes
+# Return the column names (vector groups expanded into components) and the offset of the first data line
+def parse_header(chunk):
+    header, previous, start = b'', b'', 0
+    while start < len(chunk):
+        end = chunk.find(b'\n', start)
+        end = len(chunk) if end < 0 else end
+        line = chunk[start:end].strip()
+        if line and not line.startswith(b'#'):
+            break
+        # The last comment line holds the column names
+        if line:
+            previous, header = header, line[1:]
+        start = end + 1
+    # Probes files name their columns on the line before: '# Probe 0 1 2 ...' then '# Time'
+    probes = previous.split()
+    if header.split() == [b'Time'] and probes[:1] == [b'Probe']:
+        header = b' '.join([b'Time'] + [b'probe_' + x for x in probes[1:]])
+    # Pair the header names with the groups following them
+    items = []
+    for x in nest(header):
+        if isinstance(x, list) and items and items[-1][1] is None:
+            items[-1] = (items[-1][0], flatten(x))
+        elif not isinstance(x, list):
+            items.append((x, None))
+    end = chunk.find(b'\n', start)
+    values = nest(chunk[start:len(chunk) if end < 0 else end])
+    if len(items) == len(values):
+        names = [y for (name, labels), value in zip(items, values) for y in expand(name, value, labels)]
+    else:
+        # Use the header as it is, numbering the columns it does not name
+        names = [x[0] for x in items]
+        names = names[:len(flatten(values))] if values else names
+        names += ['column_' + str(x) for x in range(len(names), len(flatten(values)))]
+    return names, min(start, len(chunk))
+
+
+# Finished time directories may be compressed: their field files are then read through the decompressor of their
+# extension, which streams them block by block like the plain files (and releases the GIL, so that the read threads
+# of a Line decompress several files in parallel)
+COMPRESSORS = {'.gz': gzip.open, '.xz': lzma.open}
+
+
+def compressed(path):
+    return os.path.splitext(path)[1] in COMPRESSORS
+
+
+# Open a plain or compressed data file for binary reading
+def open_data(path):
+    return COMPRESSORS.get(os.path.splitext(path)[1], open)(path, 'rb')
+
+
+# Name of the field a data file holds: force.dat.gz -> force.dat
+def field_name(name):
+    return os.path.splitext(name)[0] if compressed(name) else name
+
+
+# Path of the file of <field> in a time directory, plain or compressed (None when there is none)
+def data_path(directory, field):
+    for name in [field] + [field + x for x in COMPRESSORS]:
+        if os.path.isfile(os.path.join(directory, name)):
+            return os.path.join(directory, name)
+    return None
+
+
+# Column names of a data file, from its first bytes only
+def read_header(path):
+    with open_data(path) as f:
+        return parse_header(f.read(1 << 20))[0]
+
+
+# Parse complete data lines into a (rows, columns) array, parentheses are ignored
+# Comment lines are skipped, missing or unreadable values are set to zero and extra values are ignored
+def parse_rows(chunk, columns, dtype=np.float64):
+    if b'#' in chunk:
+        chunk = b'\n'.join(x for x in chunk.split(b'\n') if not x.lstrip().startswith(b'#'))
+    chunk = chunk.translate(None, b'()')
+    # Fast path: a single C-level conversion when every line holds exactly <columns> numbers
+    rows = chunk.count(b'\n') + (1 if chunk and not chunk.endswith(b'\n') else 0)
+    try:
+        values = np.fromstring(chunk, dtype=np.float64, sep=' ')
+    except ValueError:
+        values = None
+    if values is not None and values.size == rows * columns:
+        # Same as the slow path: 'nan' tokens are missing values too (infinities of a diverging run are kept)
+        values[np.isnan(values)] = 0.0
+        return values.reshape(rows, columns).astype(dtype, copy=False)
+    # Slow path for blank, ragged or non-numeric lines
+    lines = [x.split() for x in chunk.split(b'\n') if x.strip()]
+    array = np.zeros((len(lines), columns), dtype)
+    for x, tokens in enumerate(lines):
+        for y, token in enumerate(tokens[:columns]):
+            try:
+                array[x, y] = float(token)
+            except ValueError:
+                pass
+    array[np.isnan(array)] = 0.0
+    return array
+
+
+# Sort key of time directory names: numerically when possible, other names after them
+def time_key(name):
+    try:
+        return 0, float(name), name
+    except ValueError:
+        return 1, 0.0, name
+
+
+# Index of a postProcessing directory (folder -> time -> field files), built in a single os.scandir walk
+# update() rescans only the directory reported by the file system watcher
+# Compressed field files are listed under the name of their field (see data_path for their path)
+class CaseIndex:
+    def __init__(self, maindir):
+        self.maindir = maindir
+        self.tree = {}
+        # Sorted times of every (folder, field), rebuilt on demand when a folder changes
+        self.fieldTimes = {}
+        self.scan()
+
+    @staticmethod
+    def list_dirs(path):
+        try:
+            return [x.name for x in os.scandir(path) if x.is_dir()]
+        except (FileNotFoundError, NotADirectoryError):
+            return []
+
+    @staticmethod
+    def list_files(path):
+        try:
+            return {x.name for x in os.scandir(path) if x.is_file()}
+        except (FileNotFoundError, NotADirectoryError):
+            return set()
+
+    def scan(self):
+        self.tree = {}
+        self.fieldTimes = {}
+        with foamTrace.span('scan', maindir=self.maindir):
+            for folder in self.list_dirs(self.maindir):
+                self.scan_folder(folder)
+
+    # Scan the times of a folder, the listings of known times are kept when <keep> is True
+    # (except for empty and newest times, which the solver may still be filling)
+    def scan_folder(self, folder, keep=False):
+        old = self.tree.get(folder, {}) if keep else {}
+        newest = max(old, key=time_key) if old else None
+        times = {}
+        for x in self.list_dirs(os.path.join(self.maindir, folder)):
+            if x in old and old[x] and x != newest:
+                times[x] = old[x]
+            else:
+                times[x] = self.list_files(os.path.join(self.maindir, folder, x))
+        self.tree[folder] = times
+        self.fieldTimes.pop(folder, None)
+
+    # Rescan a modified directory of the case (postProcessing, a folder or a time)
+    def update(self, path):
+        relative = os.path.relpath(os.path.normpath(path), self.maindir)
+        parts = [] if relative == '.' else relative.split(os.sep)
+        if len(parts) == 0:
+            folders = self.list_dirs(self.maindir)
+            for folder in [x for x in self.tree if x not in folders]:
+                del self.tree[folder]
+                self.fieldTimes.pop(folder, None)
+            for folder in [x for x in folders if x not in self.tree]:
+                self.scan_folder(folder)
+        elif len(parts) == 1:
+            self.scan_folder(parts[0], keep=True)
+        elif len(parts) == 2 and parts[0] in self.tree:
+            if os.path.isdir(path):
+                self.tree[parts[0]][parts[1]] = self.list_files(path)
+            else:
+                self.tree[parts[0]].pop(parts[1], None)
+            self.fieldTimes.pop(parts[0], None)
+
+    def folders(self):
+        return sorted(self.tree)
+
+    def fields(self, folder):
+        return sorted(self.field_times(folder))
+
+    # Sorted times of a folder, or only those holding <field>
+    def times(self, folder, field=None):
+        if field is None:
+            return sorted(self.tree.get(folder, {}), key=time_key)
+        return self.field_times(folder).get(field, [])
+
+    def field_times(self, folder):
+        if folder not in self.fieldTimes:
+            fieldTimes = {}
+            for x in sorted(self.tree.get(folder, {}), key=time_key):
+                for field in {field_name(y) for y in self.tree[folder][x]}:
+                    fieldTimes.setdefault(field, []).append(x)
+            self.fieldTimes[folder] = fieldTimes
+        return self.fieldTimes[folder]
+
+
+class Line:
+    # Number of threads reading the time files of a line concurrently (1 reads them one by one)
+    readThreads = min(8, os.cpu_count() or 1)
+    # Size of the blocks a time file is streamed through the parser with
+    blockSize = 1 << 24
+    # Cache of the finished time files (None disables it)
+    cache = ParseCache()
+    # Storage type of the data columns for the session (float32 halves the memory), the time column stays float64
+    dtype = np.float64
+    # Files with more columns (e.g. probes) are wide: every time file is memory-mapped (from the parse cache, or from a
+    # MappedArray, which the tails of the growing one are written to) and single columns are copied from the mapped
+    # column-major segments without parsing again
+    wideColumns = 256
+    # Size of the blocks the end of the time files is read backwards with, by Lines following the tail
+    followBlock = 1 << 20
+
+    def __init__(self, maindir, folder, field, timeNames=None, cancelled=None, progress=None, columns=None,
+                 follow=None):
+
+        # Byte offset, partial-line remainder and identity of every tracked file
+        self.offsets = {}
+        # Count the applied reads, so that results computed from an older state can be detected
+        self.generation = 0
+        # Only the time column and the requested columns are kept in memory, the others are loaded on demand
+        self.columns = []
+        # Use order of the Line in a LineCache (its data is evicted first when it is the least recently used)
+        self.lastUsed = 0
+        # Rolling statistics of columns (see rolling)
+        self.stats = {}
+        # Column-major (columns, rows) segments of a wide Line, in merge order: one per time file and per appended tail
+        self.wide = False
+        self.segments = []
+        # MappedArray of the growing (last) time file of a wide Line
+        self.growing = None
+        # (path, columns, offset) of the growing time file parsed by a load which kept only the time, so that the
+        # first column requested reads only the rows appended since
+        self.parsed = None
+        # Follow the tail: (rows, span) reads only the last rows and/or the rows of the last span of time, and
+        # partial is True while the older rows were not read
+        self.follow = follow
+        self.partial = False
+        # Read data
+        self.read_data(maindir, folder, field, timeNames, cancelled, progress, columns)
+
+    def read_data(self, maindir, folder, field, timeNames=None, cancelled=None, progress=None, columns=None):
+        self.apply(self.load(maindir, folder, field, timeNames, cancelled, progress, columns))
+
+    # Parse all time files without modifying the Line, so that it can run off the GUI thread
+    # <cancelled> is an optional threading.Event and <progress> an optional callable(done, total)
+    # <columns> are the data columns to keep besides the time, by default the ones the Line already holds
+    # A Line following the tail reads only the end of its newest files, unless <history> is True
+    def load(self, maindir, folder, field, timeNames=None, cancelled=None, progress=None, columns=None,
+             history=False):
+
+        if self.follow is not None and not history:
+            return self.load_follow(maindir, folder, field, timeNames, cancelled, progress, columns)
+
+        start = foamTrace.now()
+
+        if timeNames is None:
+            timeNames = []
+
+        # Retrieve a list of valid file paths (plain or compressed)
+        fileList = [x for x in (data_path(os.path.join(maindir, folder, y), field) for y in timeNames) if x]
+        # Retrieve the data file header (vector groups are expanded into component columns)
+        header = read_header(fileList[0])
+        wide = len(header) > self.wideColumns
+        # Keep the time column and the requested columns which exist, in header order
+        columns = set(self.columns if columns is None else columns)
+        columns = header[:1] + [x for x in header[1:] if x in columns]
+
+        def read(path):
+            if cancelled is not None and cancelled.is_set():
+                raise LoadCancelled(path)
+            # The growing file parsed by the previous load is completed with the rows appended since
+            parsed = self.parsed
+            if parsed is not None and parsed[0] == path == fileList[-1] and len(parsed[1]) == len(header):
+                appended = self.read_appended(path, header, parsed[2])
+                if appended is not None:
+                    return np.concatenate([parsed[1], appended[0].T], axis=1), appended[1]
+            # Only the last time file may still grow, the others are finished and can be cached (and mapped, when wide)
+            return self.read_file(path, header, path != fileList[-1], wide and path != fileList[-1], cancelled)
+
+        # Read the time files concurrently and merge them in time directory order
+        with ThreadPoolExecutor(max_workers=max(1, min(self.readThreads, len(fileList)))) as executor:
+            futures = [executor.submit(read, path) for path in fileList]
+            try:
+                for x, future in enumerate(as_completed(futures)):
+                    future.result()
+                    if progress is not None:
+                        progress(x + 1, len(fileList))
+            except BaseException:
+                executor.shutdown(cancel_futures=True)
+                raise
+        offsets = {}
+        dataList = []
+        for path, future in zip(fileList, futures):
+            data, offsets[path] = future.result()
+            dataList += [data]
+        # The growing file of a wide Line is mapped from a temporary file, its tails are written after its rows
+        growing = None
+        if wide:
+            growing = MappedArray(len(header), dataList[-1].shape[1], dataList[-1].dtype)
+            dataList[-1] = growing.write(0, dataList[-1])
+        # Copy the selected columns of the time files once into the column store
+        store = ColumnStore(columns, sum(x.shape[1] for x in dataList), self.dtype, {header[0]: np.float64})
+        for data in dataList:
+            # Later restarts supersede the overlapping end of the earlier ones
+            store.merge(dict(zip(header, data)), header[0])
+
+        foamTrace.complete('load', start, field=os.path.join(folder, field), files=len(fileList))
+
+        # A load keeping only the time (e.g. of a newly selected field) keeps the parse of the growing file for the
+        # first column requested (wide Lines project their columns from the segments)
+        parsed = None
+        if len(columns) == 1 and not wide and fileList:
+            parsed = (fileList[-1], dataList[-1], offsets[fileList[-1]])
+
+        return {'maindir': maindir, 'folder': folder, 'field': field, 'timeNames': timeNames, 'fileList': fileList,
+                'header': header, 'columns': columns, 'offsets': offsets, 'data': store, 'wide': wide,
+                'segments': dataList if wide else [], 'growing': growing, 'parsed': parsed, 'partial': False}
+
+    # Read the last rows of the time files backwards from the end of the newest one, block by block and through the
+    # older ones only when needed, until <self.follow> = (rows, span) is satisfied: at least <rows> rows, or the rows
+    # of the last <span> of time (either can be None). Only the tail of the newest file is tracked for appends
+    def load_follow(self, maindir, folder, field, timeNames=None, cancelled=None, progress=None, columns=None):
+
+        start = foamTrace.now()
+        rows, span = self.follow
+
+        if timeNames is None:
+            timeNames = []
+
+        fileList = [x for x in (data_path(os.path.join(maindir, folder, y), field) for y in timeNames) if x]
+        header = read_header(fileList[0])
+        columns = set(self.columns if columns is None else columns)
+        columns = header[:1] + [x for x in header[1:] if x in columns]
+
+        offsets = {}
+        # Parsed rows of the files read, newest file first
+        dataList = []
+        count, last, enough = 0, None, False
+        # Time of the first row of the newer files, the rows of an older file from it on are superseded by them (see
+        # ColumnStore.merge) and do not count
+        first = np.inf
+        for path in reversed(fileList):
+            # A compressed file can only be streamed forward, it is read whole (and cached) like in load
+            if compressed(path):
+                if cancelled is not None and cancelled.is_set():
+                    raise LoadCancelled(path)
+                data, offset = self.read_file(path, header, True, cancelled=cancelled)
+                if path == fileList[-1]:
+                    offsets[path] = offset
+                if data.shape[1]:
+                    count += int(np.searchsorted(data[0], first, side='left'))
+                    last = data[0, -1] if last is None else last
+                    enough = bool(rows and count >= rows) or bool(span and data[0, 0] <= last - span)
+                dataList.append(data.T)
+                if data.shape[1]:
+                    first = min(first, data[0, 0])
+                if enough:
+                    break
+                continue
+            blocks = []
+            with open(path, 'rb') as f:
+                stat = os.fstat(f.fileno())
+                position, carry = stat.st_size, b''
+                # The incomplete last line of the newest file is kept for the next read
+                growing = path == fileList[-1]
+                if growing:
+                    offsets[path] = (stat.st_size, b'', (stat.st_dev, stat.st_ino))
+                while position > 0 and not enough:
+                    if cancelled is not None and cancelled.is_set():
+                        raise LoadCancelled(path)
+                    step = min(self.followBlock, position)
+                    position -= step
+                    with foamTrace.span('io'):
+                        f.seek(position)
+                        chunk = f.read(step) + carry
+                    if growing:
+                        end = chunk.rfind(b'\n') + 1
+                        if end == 0 and position > 0:
+                            carry = chunk
+                            continue
+                        offsets[path] = (stat.st_size, chunk[end:], (stat.st_dev, stat.st_ino))
+                        chunk, growing = chunk[:end], False
+                    if position > 0:
+                        # The first line of the block may be incomplete, the previous block completes it
+                        cut = chunk.find(b'\n') + 1
+                        if cut == 0:
+                            carry = chunk
+                            continue
+                        carry, chunk = chunk[:cut], chunk[cut:]
+                    else:
+                        chunk = chunk[parse_header(chunk)[1]:]
+                    with foamTrace.span('parse', bytes=len(chunk)):
+                        block = parse_rows(chunk, len(header))
+                    foamTrace.count('bytes_parsed', len(chunk))
+                    if len(block):
+                        blocks.append(block)
+                        count += int(np.searchsorted(block[:, 0], first, side='left'))
+                        last = block[-1, 0] if last is None else last
+                        enough = bool(rows and count >= rows) or bool(span and block[0, 0] <= last - span)
+            dataList.append(np.concatenate(blocks[::-1]) if blocks else np.empty((0, len(header))))
+            if len(dataList[-1]):
+                first = min(first, dataList[-1][0, 0])
+            if enough:
+                break
+        # Merge the files in time directory order, later restarts supersede the overlapping end of the earlier ones
+        store = ColumnStore(columns, sum(len(x) for x in dataList), self.dtype, {header[0]: np.float64})
+        for data in reversed(dataList):
+            store.merge(dict(zip(header, data.T)), header[0])
+        # Keep exactly the requested rows
+        first = 0
+        if rows:
+            first = max(first, len(store) - rows)
+        if span and len(store):
+            first = max(first, store.between(header[0], store.column(header[0])[-1] - span).start)
+        if first > 0:
+            window = ColumnStore(columns, len(store) - first, self.dtype, {header[0]: np.float64})
+            window.append({x: store.column(x)[first:] for x in columns})
+            store = window
+
+        foamTrace.complete('load_follow', start, field=os.path.join(folder, field), files=len(dataList))
+
+        return {'maindir': maindir, 'folder': folder, 'field': field, 'timeNames': timeNames, 'fileList': fileList,
+                'header': header, 'columns': columns, 'offsets': offsets,
+                'data': store, 'wide': False, 'segments': [], 'growing': None, 'parsed': None, 'partial': enough}
+
+    # Read all the rows of a Line following the tail (e.g. when the view reaches before its first row), which then
+    # stops following
+    def load_history(self, cancelled=None, progress=None):
+        state = self.load(self.maindir, self.folder, self.field, self.timeNames, cancelled, progress, history=True)
+        state['follow'] = None
+        return state
+
+    # Load the Line again with the additional data <columns> (finished time files come from the parse cache)
+    # Wide Lines copy them from their mapped segments instead, which takes the same time whatever the number of columns
+    def load_columns(self, columns, cancelled=None, progress=None):
+        columns = self.columns[1:] + [x for x in columns if x not in self.columns]
+        if self.wide:
+            return self.project(columns)
+        return self.load(self.maindir, self.folder, self.field, self.timeNames, cancelled, progress, columns)
+
+    # Build the data of a wide Line with the time and the requested <columns> from its segments
+    def project(self, columns):
+        columns = set(columns)
+        columns = self.header[:1] + [x for x in self.header[1:] if x in columns]
+        index = {x: y for y, x in enumerate(self.header)}
+        store = ColumnStore(columns, sum(x.shape[1] for x in self.segments), self.dtype, {self.header[0]: np.float64})
+        for segment in self.segments:
+            # A row of a column-major segment is one contiguous column, only its pages are read
+            store.merge({x: segment[index[x]] for x in columns}, self.header[0])
+        return {'columns': columns, 'data': store}
+
+    def has_column(self, column):
+        return column in self.columns
+
+    # Free the data columns which are neither plotted nor in <keep>, they are loaded again on demand
+    def release_columns(self, keep=()):
+        plotted = [x for x, y in zip(self.header, self.plottedColumns) if y]
+        released = [x for x in self.columns[1:] if x not in plotted and x not in keep]
+        if self.data is not None:
+            self.data.drop(released)
+        self.columns = [x for x in self.columns if x not in released]
+        for x in released:
+            self.stats.pop(x, None)
+
+    # Rolling statistics of a column over a trailing <window> of rows, brought up to date with the new rows
+    def rolling(self, column, window):
+        stats = self.stats.get(column)
+        if stats is None or stats.window != window:
+            stats = self.stats[column] = RollingStats(window)
+        stats.update(self.data.column(self.header[0]), self.data.column(column), self.data)
+        return stats
+
+    # Replace (or extend, for the result of load_tail) the Line state with a finished load
+    def apply(self, state):
+        state = dict(state)
+        append = state.pop('append', None)
+        self.__dict__.update(state)
+        # An evicted Line gets all its rows on the next full load
+        if append is not None and self.data is not None:
+            self.data.merge(append, self.header[0])
+        self.generation += 1
+
+    # Memory held by the data of the Line (and the parse of its growing file kept for the first column requested)
+    @property
+    def nbytes(self):
+        return (self.data.nbytes if self.data is not None else 0) + (
+            self.parsed[1].nbytes if self.parsed is not None else 0)
+
+    # Free the data but keep the header, file list, offsets and selected columns, so that a later load is fast
+    # (the finished time files come from the parse cache)
+    def evict(self):
+        self.data = None
+        self.segments = []
+        self.growing = None
+        self.parsed = None
+        self.stats = {}
+        self.generation += 1
+
+    # Stream a whole file (through its decompressor if it is compressed) through the parser and record where its last
+    # complete line ends
+    # Return its columns as a (columns, rows) array, finished files are loaded from (and stored in) the parse cache
+    # when <cached> is True, and a freshly parsed file is returned memory-mapped when <mapped> is True (from the cache,
+    # or from a MappedArray when it could not be cached)
+    # <cancelled> (a threading.Event) is checked before every block, so that a large file stops parsing at once
+    @classmethod
+    def read_file(cls, path, header, cached=False, mapped=False, cancelled=None):
+        cache = cls.cache if cached else None
+        if cache is not None:
+            stat = os.stat(path)
+            entry = cache.get(path, stat)
+            if entry is not None and entry[0]['header'] == list(header):
+                info, array = entry
+                foamTrace.count('cache_hits')
+                return array, (info['offset'], info['remainder'].encode('latin-1'), (stat.st_dev, stat.st_ino))
+        blocks = []
+        size, remainder = 0, b''
+        with open_data(path) as f:
+            stat = os.fstat(f.fileno())
+            while True:
+                if cancelled is not None and cancelled.is_set():
+                    raise LoadCancelled(path)
+                with foamTrace.span('io'):
+                    chunk = f.read(cls.blockSize)
+                if not chunk:
+                    break
+                # Skip this file's header in its first block
+                start = parse_header(chunk)[1] if size == 0 else 0
+                size += len(chunk)
+                chunk = remainder + chunk[start:]
+                # Only complete lines are parsed, the rest is kept for the next block (or read)
+                end = chunk.rfind(b'\n') + 1
+                remainder = chunk[end:]
+                with foamTrace.span('parse', bytes=end):
+                    blocks.append(parse_rows(chunk[:end], len(header)))
+                foamTrace.count('bytes_parsed', end)
+        array = np.concatenate(blocks).T if blocks else np.empty((len(header), 0))
+        # Cache only files that did not change while they were read (a compressed file is complete once its end of
+        # stream was decompressed, a truncated one raises EOFError)
+        if cache is not None and (size == stat.st_size or compressed(path)):
+            stored = cache.put(path, stat, {'path': path, 'header': list(header), 'offset': size,
+                                            'remainder': remainder.decode('latin-1')}, np.ascontiguousarray(array))
+            entry = cache.get(path, stat) if stored and mapped else None
+            if entry is not None:
+                array = entry[1]
+        if mapped and not isinstance(array, np.memmap):
+            array = MappedArray(*array.shape, array.dtype).write(0, array)
+        return array, (size, remainder, (stat.st_dev, stat.st_ino))
+
+    # Parse the complete lines appended to a file since <offset> = (size, remainder, identity)
+    # Return the (rows, columns) array of the new rows and the new offset, or None when the file was truncated or
+    # replaced (e.g. rotated by the solver), or compressed (its offset counts decompressed bytes, and the plain file is
+    # gone), and has to be read again
+    @staticmethod
+    def read_appended(path, header, offset):
+        offset, remainder, identity = offset
+        stat = os.stat(path) if os.path.isfile(path) else None
+        if stat is None or compressed(path) or (stat.st_dev, stat.st_ino) != identity or stat.st_size < offset:
+            return None
+        with foamTrace.span('io'), open(path, 'rb') as f:
+            f.seek(offset)
+            chunk = remainder + f.read()
+        end = chunk.rfind(b'\n') + 1
+        rows = np.empty((0, len(header)))
+        if chunk[:end].strip():
+            with foamTrace.span('parse', bytes=end):
+                rows = parse_rows(chunk[:end], len(header))
+            foamTrace.count('bytes_parsed', end)
+        return rows, (offset + len(chunk) - len(remainder), chunk[end:], identity)
+
+    def re_read_data(self):
+        self.apply(self.load_tail())
+
+    # Parse only the bytes appended to the last file since the previous read
+    def load_tail(self, cancelled=None, progress=None):
+        path = self.fileList[-1]
+        appended = self.read_appended(path, self.header, self.offsets[path])
+        if appended is None:
+            print('File: ' + path + ' was truncated, replaced or compressed, reading it again')
+            return self.load(self.maindir, self.folder, self.field, self.timeNames, cancelled, progress)
+        offsets = dict(self.offsets)
+        rows, offsets[path] = appended
+        state = {'offsets': offsets}
+        # Apply only when at least one complete line was added
+        if len(rows):
+            foamTrace.count('rows_appended', len(rows))
+            state['append'] = dict(zip(self.header, rows.T))
+            # Wide Lines write the appended rows after the mapped rows of the growing file, for the columns loaded later
+            if self.wide and self.growing is not None:
+                state['segments'] = self.segments[:-1] + [self.growing.write(self.segments[-1].shape[1], rows.T)]
+        return state
+
+    # Rows of the data between two times (binary search on the monotonic time column), e.g. data.to_frame(rows)
+    def time_range(self, tmin=-np.inf, tmax=np.inf):
+        return self.data.between(self.header[0], tmin, tmax)
+
+    def is_plotted(self, column, value):
+        self.plottedColumns[column] = value
+
+    def reset_plottedColumns(self):
+        self.plottedColumns = list(bytearray(len(self.header)))
+
+
+# Mean, standard deviation (and mean -+ std) and relative change of the mean over a trailing window of rows, one
+# value per row of a growing column. Prefix sums of the values (taken relative to the first one, which limits the
+# cancellation) give the sums of any window at once, so that appended rows are processed in O(new rows)
+# Non-finite values (e.g. the NaN rows of a field solved from a later time on) are left out: they add nothing to the
+# sums, and the prefix count of the finite values gives the number of values of every window
+class RollingStats:
+    def __init__(self, window):
+        self.window = max(1, int(window))
+        self.store = ColumnStore(['sum', 'squares', 'count', 'mean', 'std', 'low', 'high', 'change'])
+        # Column store and last (time, value) the statistics were computed from, to detect replaced rows
+        self.source = None
+        self.last = None
+        # First finite value (None until there is one)
+        self.reference = None
+
+    def __len__(self):
+        return len(self.store)
+
+    def column(self, name):
+        return self.store.column(name)
+
+    # Process the rows of <y> (against time <x>, both columns of the store <source>) added since the last update
+    def update(self, x, y, source):
+        n = len(self.store)
+        # Start again when the rows were replaced: a full load or a restart superseding processed rows
+        if (source is not self.source or n > len(y) or
+                (n and not np.array_equal((x[n - 1], y[n - 1]), self.last, equal_nan=True))):
+            self.source = source
+            self.store.length = n = 0
+            self.reference = None
+        if n == len(y):
+            return
+        new = y[n:].astype(np.float64)
+        finite = np.isfinite(new)
+        # The reference is taken once, the rows before it were all non-finite and their sums are zero
+        if self.reference is None and finite.any():
+            self.reference = float(new[finite][0])
+        new = np.where(finite, new - (self.reference or 0.0), 0.0)
+        start = [self.store.column(x)[-1] if n else 0.0 for x in ['sum', 'squares', 'count']]
+        empty = np.empty(len(new))
+        self.store.append({'sum': start[0] + np.cumsum(new), 'squares': start[1] + np.cumsum(new * new),
+                           'count': start[2] + np.cumsum(finite), 'mean': empty, 'std': empty, 'low': empty,
+                           'high': empty, 'change': empty})
+        column = self.store.column
+        index = np.arange(n, len(y))
+        lower = index - self.window
+        valid = lower >= 0
+
+        def windowed(name):
+            return column(name)[index] - np.where(valid, column(name)[np.maximum(lower, 0)], 0.0)
+        sums, squares, count = windowed('sum'), windowed('squares'), windowed('count')
+        # Windows without finite values have no statistics
+        with np.errstate(invalid='ignore', divide='ignore'):
+            mean = np.where(count > 0, sums / count, np.nan)
+            std = np.sqrt(np.maximum(squares / count - mean * mean, 0.0))
+        column('mean')[index] = mean + (self.reference or 0.0)
+        column('std')[index] = std
+        column('low')[index] = column('mean')[index] - std
+        column('high')[index] = column('mean')[index] + std
+        # Change of the mean over one window, relative to the mean (undefined for the first window)
+        previous = np.where(valid, column('mean')[np.maximum(lower, 0)], np.nan)
+        current = column('mean')[index]
+        column('change')[index] = np.abs(current - previous) / np.maximum(np.abs(current), np.finfo(float).tiny)
+        self.last = (x[len(y) - 1], y[len(y) - 1])
+
+    # Whether the last relative change over the window is below <threshold>
+    def converged(self, threshold):
+        return len(self) > self.window and bool(self.column('change')[-1] < threshold)
+
+
+# Memory budget of the data of many Lines (e.g. of every case, folder and field opened in a session)
+# The least recently used Lines lose their data when the budget is exceeded, the Lines in use are never evicted
+class LineCache:
+    def __init__(self, maxBytes=2 * 1024 ** 3):
+        self.maxBytes = maxBytes
+        self.clock = 0
+
+    # Mark <line> as the most recently used one
+    def touch(self, line):
+        self.clock += 1
+        line.lastUsed = self.clock
+
+    # Evict the least recently used of <lines>, except those in <keep>, until their data fits in the budget
+    # Return the evicted Lines
+    def trim(self, lines, keep=()):
+        total = sum(x.nbytes for x in lines)
+        evicted = []
+        for line in sorted(lines, key=lambda x: x.lastUsed):
+            if total <= self.maxBytes:
+                break
+            if line in keep or line.data is None:
+                continue
+            total -= line.nbytes
+            line.evict()
+            evicted.append(line)
+        return evicted
+
+
+# Reduce a series to the minimum and maximum of each of <pixels> buckets between xmin and xmax (about 2 points per
+# pixel), so that peaks and spikes remain visible. The series is returned at full resolution when it is short enough
+# <x> must be sorted (as the time column of a Line is)
+def decimate(x, y, xmin=-np.inf, xmax=np.inf, pixels=1500):
+    # Keep one point beyond each limit, so that the line reaches the border of the view
+    first = max(0, np.searchsorted(x, xmin, side='left') - 1)
+    last = min(len(x), np.searchsorted(x, xmax, side='right') + 1)
+    x, y = x[first:last], y[first:last]
+    n = len(x)
+    pixels = max(1, int(pixels))
+    if n <= 2 * pixels:
+        return x, y
+    # Split the series in buckets of equal size and find the extremes of each one
+    size = n // pixels
+    m = n // size
+    buckets = y[:m * size].reshape(m, size)
+    offset = np.arange(m) * size
+    index = [buckets.argmin(axis=1) + offset, buckets.argmax(axis=1) + offset, [0, n - 1]]
+    if m * size < n:
+        tail = y[m * size:]
+        index.append([m * size + tail.argmin(), m * size + tail.argmax()])
+    index = np.unique(np.concatenate(index))
+    return x[index], y[index]
+
+
+# Raised inside a background load when it was cancelled by the user
+class LoadCancelled(Exception):
+    pass
+
+
+# Read (or re_read) several lines in one background job
+# <tasks> is a list of (line, args) where args are the load() arguments, or None to read only the file tail
+def load_lines(tasks, cancelled=None, progress=None):
+    states = []
+    for x in range(len(tasks)):
+        if cancelled is not None and cancelled.is_set():
+            raise LoadCancelled()
+        line, args = tasks[x]
+        states.append((line, line.generation, line.load(*args) if args is not None else line.load_tail()))
+        if progress is not None:
+            progress(x + 1, len(tasks))
+    return states
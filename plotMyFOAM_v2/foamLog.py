@@ -0,0 +1,243 @@
+import os
+import re
+import threading
+from array import array
+
+import numpy as np
+
+import foamTrace
+from foamData import Line, ColumnStore, LoadCancelled, compressed
+
+# Series extracted from a solver log, shown as the fields of a 'log.<solver>' folder
+FIELDS = ['residuals', 'finalResiduals', 'iterations', 'continuity', 'courant', 'timing']
+
+NUMBER = rb'([^,\s]+)'
+# One alternative per kind of log line, the outer group of the matching one is the lastgroup of the match
+PATTERN = re.compile(
+    rb'^[ \t]*(?:'
+    rb'(?P<time>Time = ([-+0-9.eE]+)s?[ \t]*\r?$)|'
+    rb'(?P<solve>(?:\S+:[ \t]+)?Solving for ([^,\s]+), Initial residual = ' + NUMBER +
+    rb', Final residual = ' + NUMBER + rb', No Iterations (\d+))|'
+    rb'(?P<continuity>time step continuity errors : sum local = ' + NUMBER + rb', global = ' + NUMBER +
+    rb', cumulative = ' + NUMBER + rb')|'
+    rb'(?P<courant>(Interface )?Courant Number mean: ' + NUMBER + rb' max: ' + NUMBER + rb')|'
+    rb'(?P<deltaT>deltaT = ' + NUMBER + rb')|'
+    rb'(?P<execution>ExecutionTime = ' + NUMBER + rb' s[ \t]+ClockTime = ' + NUMBER + rb' s)'
+    rb')', re.M)
+
+
+# Solver log files of a case (next to its postProcessing directory), compressed logs cannot be followed and are skipped
+def find_logs(maindir):
+    try:
+        return sorted(x.name for x in os.scandir(os.path.dirname(maindir)) if x.name.startswith('log.') and
+                      not compressed(x.name) and x.is_file())
+    except (FileNotFoundError, NotADirectoryError):
+        return []
+
+
+def is_log(folder):
+    return folder.startswith('log.')
+
+
+# Streaming parser of an OpenFOAM solver log with a checkpoint: the byte offset, the incomplete last line and the time
+# step being parsed are kept, so that every update parses only the content appended since the previous one
+# Every time step adds one row to each series (FIELDS) it printed values of: the first initial residual, the last final
+# residual and the total iterations of every solved field, the last continuity errors, the Courant numbers, deltaT and
+# the execution and clock times
+class SolverLog:
+    # Size of the blocks the log is parsed in
+    blockSize = 1 << 24
+    # Parsers of the opened logs, shared by the Lines of their series. A log is closed (and its series freed) once none
+    # of its Lines holds data, the next read parses it again from the start
+    logs = {}
+    logsLock = threading.Lock()
+
+    @classmethod
+    def open(cls, path):
+        path = os.path.abspath(path)
+        with cls.logsLock:
+            if path not in cls.logs:
+                cls.logs[path] = cls(path)
+            return cls.logs[path]
+
+    # Forget that <line> holds data of its log, and close the log when it was the last one
+    @classmethod
+    def release(cls, line):
+        with cls.logsLock:
+            line.log.lines.discard(line)
+            if not line.log.lines and cls.logs.get(line.log.path) is line.log:
+                del cls.logs[line.log.path]
+
+    def __init__(self, path):
+        self.path = path
+        # Held while the log is parsed or its series are copied (re-entrant, a tail may fall back to a full load)
+        self.lock = threading.RLock()
+        # Lines holding data of the log
+        self.lines = set()
+        self.reset()
+
+    def reset(self):
+        self.offset, self.remainder, self.identity = 0, b'', None
+        # Values of the time step being parsed, by series and column (its time is None until the 'Time =' line)
+        self.step = None
+        # Columns (as arrays, Time first) and number of rows of every series
+        self.series = {x: {'Time': array('d')} for x in FIELDS}
+        self.rows = dict.fromkeys(FIELDS, 0)
+
+    # Parse the content appended since the last update (all of it the first time, or when the log was replaced)
+    def update(self, cancelled=None, progress=None):
+        stat = os.stat(self.path)
+        if self.identity != (stat.st_dev, stat.st_ino) or stat.st_size < self.offset:
+            if self.identity is not None:
+                print('File: ' + self.path + ' was truncated or replaced, reading it again')
+            self.reset()
+            self.identity = (stat.st_dev, stat.st_ino)
+        with open(self.path, 'rb') as f:
+            f.seek(self.offset)
+            while True:
+                # The checkpoint stays consistent, a cancelled update resumes from the last parsed block
+                if cancelled is not None and cancelled.is_set():
+                    raise LoadCancelled(self.path)
+                with foamTrace.span('io'):
+                    chunk = f.read(self.blockSize)
+                if not chunk:
+                    break
+                self.offset += len(chunk)
+                chunk = self.remainder + chunk
+                end = chunk.rfind(b'\n') + 1
+                self.remainder = chunk[end:]
+                with foamTrace.span('parse', bytes=end):
+                    self.parse(chunk[:end])
+                foamTrace.count('bytes_parsed', end)
+                if progress is not None:
+                    # In MB, so that multi-GB logs fit the progress signal
+                    progress(self.offset >> 20, max(1, stat.st_size >> 20))
+
+    def parse(self, chunk):
+        for match in PATTERN.finditer(chunk):
+            kind = match.lastgroup
+            if kind == 'time':
+                # Values printed before the time (e.g. Courant number and deltaT) belong to its step
+                if self.step is not None and self.step['Time'] is not None:
+                    self.finish()
+                self.values()['Time'] = float(match.group(2))
+                continue
+            values = self.values()
+            if kind == 'solve':
+                field = match.group(4).decode()
+                values['residuals'].setdefault(field, float(match.group(5)))
+                values['finalResiduals'][field] = float(match.group(6))
+                values['iterations'][field] = values['iterations'].get(field, 0) + int(match.group(7))
+            elif kind == 'continuity':
+                values['continuity'].update(local=float(match.group(9)), glob=float(match.group(10)),
+                                            cumulative=float(match.group(11)))
+            elif kind == 'courant':
+                prefix = 'interface_' if match.group(13) else ''
+                values['courant'].setdefault(prefix + 'mean', float(match.group(14)))
+                values['courant'].setdefault(prefix + 'max', float(match.group(15)))
+            elif kind == 'deltaT':
+                values['timing']['deltaT'] = float(match.group(17))
+            elif kind == 'execution':
+                values['timing'].update(ExecutionTime=float(match.group(19)), ClockTime=float(match.group(20)))
+                # The execution time closes the step
+                self.finish()
+
+    # Values of the time step being parsed
+    def values(self):
+        if self.step is None:
+            self.step = {'Time': None}
+            self.step.update({x: {} for x in FIELDS})
+        return self.step
+
+    # Add the finished time step as one row of every series it printed values of
+    def finish(self):
+        step, self.step = self.step, None
+        if step is None or step['Time'] is None:
+            return
+        for name in FIELDS:
+            if not step[name]:
+                continue
+            series = self.series[name]
+            # Columns appearing later (e.g. a field solved from a later time on) are NaN in the earlier rows
+            for column in step[name]:
+                if column not in series:
+                    series[column] = array('d', [np.nan]) * self.rows[name]
+            series['Time'].append(step['Time'])
+            for column, values in list(series.items())[1:]:
+                values.append(step[name].get(column, np.nan))
+            self.rows[name] += 1
+
+    def header(self, name):
+        return list(self.series[name])
+
+    # Memory held by the parsed series
+    @property
+    def nbytes(self):
+        return sum(x.itemsize * len(x) for series in self.series.values() for x in series.values())
+
+    # Copy the rows of a series from row <start> on, as a dictionary of arrays
+    def block(self, name, start=0):
+        return {x: np.array(y[start:], np.float64) for x, y in self.series[name].items()}
+
+
+# Line of a series of a solver log (folder 'log.<solver>', field one of FIELDS), refreshed from the log checkpoint
+# The log is parsed once for all its series, and the offsets of the Line hold the number of rows it already has
+class LogLine(Line):
+    def load(self, maindir, folder, field, timeNames=None, cancelled=None, progress=None, columns=None,
+             history=False):
+
+        start = foamTrace.now()
+
+        path = os.path.join(os.path.dirname(maindir), folder)
+        log = SolverLog.open(path)
+        with log.lock:
+            log.update(cancelled, progress)
+            header = log.header(field)
+            block = log.block(field)
+        # Logs are narrow, all the columns of the series are kept
+        store = ColumnStore(header, len(block['Time']), self.dtype, {'Time': np.float64})
+        store.append(block)
+
+        foamTrace.complete('load', start, field=os.path.join(folder, field), files=1)
+
+        return {'maindir': maindir, 'folder': folder, 'field': field, 'timeNames': timeNames or [], 'fileList': [path],
+                'header': header, 'columns': header, 'offsets': {path: len(store)}, 'log': log,
+                'data': store, 'wide': False, 'segments': [], 'growing': None, 'parsed': None, 'partial': False}
+
+    # Copy only the rows the log gained since the last read
+    def load_tail(self, cancelled=None, progress=None):
+        path = self.fileList[-1]
+        log = SolverLog.open(path)
+        with log.lock:
+            log.update(cancelled, progress)
+            rows = log.rows[self.field]
+            # New columns (e.g. a field solved from now on) or a replaced log: read the whole series again
+            if log.header(self.field) != self.header or rows < self.offsets[path]:
+                return self.load(self.maindir, self.folder, self.field, self.timeNames, cancelled, progress)
+            state = {'offsets': {path: rows}}
+            if rows > self.offsets[path]:
+                block = log.block(self.field, self.offsets[path])
+                foamTrace.count('rows_appended', len(block['Time']))
+                state['append'] = block
+        return state
+
+    # New columns are not plotted
+    def apply(self, state):
+        super().apply(state)
+        if self.data is not None:
+            self.log.lines.add(self)
+        plotted = getattr(self, 'plottedColumns', None)
+        if plotted is not None and len(plotted) < len(self.header):
+            plotted += [0] * (len(self.header) - len(plotted))
+
+    # The series parsed from the log are shared by its Lines holding data, each one counts its part of them
+    @property
+    def nbytes(self):
+        if self.data is None or self not in self.log.lines:
+            return super().nbytes
+        return super().nbytes + self.log.nbytes // len(self.log.lines)
+
+    # Free the series of the log too once none of its Lines holds data
+    def evict(self):
+        super().evict()
+        SolverLog.release(self)
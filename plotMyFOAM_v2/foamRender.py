@@ -0,0 +1,173 @@
+import numpy as np
+
+from PyQt5.QtCore import Qt
+
+import foamTrace
+
+# Only the Figure class is used (never pyplot, which loads far more)
+from matplotlib.figure import Figure
+from matplotlib.backends.backend_qt5agg import FigureCanvasQTAgg as FigureCanvas, \
+    NavigationToolbar2QT as NavigationToolbar
+
+# Rendering backends of the plot: the Widget draws through one renderer, which owns the plot widget (and its toolbar)
+# and the line handles it returns. Every renderer provides
+#   widget, toolbar (None when the widget handles the mouse itself) and viewChanged, a callable() set by the Widget
+#   which is called when the visible x range changes
+#   plot(x, y, style, color, width) -> handle, set_data(handle, x, y), color(handle), remove(handle)
+#   labels(xlabel, ylabel), title(text, color), clear()
+#   autoscaled() (whether the x range follows the data), view() -> (xmin, xmax), width() (of the plot in pixels)
+#   rescale() (to the data, unless the user zoomed or panned) and draw(idle, layout)
+# Line styles are the matplotlib ones: '-', '--' and ':'
+
+
+# Figure canvas whose draws (including the idle draws Qt coalesces) are timed as 'draw' spans
+class Canvas(FigureCanvas):
+    def draw(self):
+        with foamTrace.span('draw'):
+            super().draw()
+
+
+# Default backend: publication quality, the navigation toolbar of matplotlib, but a full redraw of the figure
+# (axes, ticks and texts included) for every refresh
+class MatplotlibRenderer:
+    def __init__(self, parent=None):
+        self.fig = Figure()
+        self.ax = self.fig.add_subplot()
+        self.widget = Canvas(self.fig)
+        self.toolbar = NavigationToolbar(self.widget, parent)
+        self.viewChanged = None
+        self.fig.tight_layout()
+        self.ax.callbacks.connect('xlim_changed', self.xlim_changed)
+
+    def xlim_changed(self, ax):
+        if self.viewChanged is not None:
+            self.viewChanged()
+
+    def plot(self, x, y, style='-', color=None, width=None):
+        (handle,) = self.ax.plot(x, y, style, color=color, linewidth=width)
+        self.ax.grid(True)
+        self.ax.margins(x=0)
+        return handle
+
+    def set_data(self, handle, x, y):
+        handle.set_data(x, y)
+
+    def color(self, handle):
+        return handle.get_color()
+
+    def remove(self, handle):
+        handle.remove()
+
+    def labels(self, xlabel, ylabel):
+        self.ax.set_xlabel(xlabel)
+        self.ax.set_ylabel(ylabel)
+
+    def title(self, text, color='green'):
+        self.ax.set_title(text, color=color, fontsize='small')
+
+    # Clear the plotted lines and axes (cla also removes the axes callbacks, so they are connected again)
+    def clear(self):
+        self.ax.cla()
+        self.ax.callbacks.connect('xlim_changed', self.xlim_changed)
+
+    def autoscaled(self):
+        return self.ax.get_autoscalex_on()
+
+    def view(self):
+        return self.ax.get_xlim()
+
+    def width(self):
+        return self.ax.bbox.width
+
+    def rescale(self):
+        self.ax.relim()
+        self.ax.autoscale_view()
+
+    # Draw now, or let Qt coalesce the draws (<idle>), after fitting the layout to the labels (<layout>)
+    def draw(self, idle=False, layout=False):
+        if layout:
+            self.fig.tight_layout()
+        if idle:
+            self.widget.draw_idle()
+        else:
+            self.widget.draw()
+
+
+# Fast backend: pyqtgraph keeps every line as a Qt graphics item, so that a refresh only replaces the data of the
+# changed lines and Qt repaints the view, at interactive frame rates for many streaming lines. Zoom and pan are done
+# with the mouse (the right button menu resets the view), there is no toolbar
+class PyQtGraphRenderer:
+    # The matplotlib color cycle, so that both backends draw the columns in the same colors
+    colors = ['#1f77b4', '#ff7f0e', '#2ca02c', '#d62728', '#9467bd', '#8c564b', '#e377c2', '#7f7f7f', '#bcbd22',
+              '#17becf']
+    styles = {'-': Qt.SolidLine, '--': Qt.DashLine, ':': Qt.DotLine}
+
+    def __init__(self, parent=None):
+        # Optional dependency, only needed when the backend is selected
+        import pyqtgraph
+        self.pyqtgraph = pyqtgraph
+        self.widget = pyqtgraph.PlotWidget(parent, background='w')
+        self.item = self.widget.getPlotItem()
+        self.viewBox = self.item.getViewBox()
+        self.toolbar = None
+        self.viewChanged = None
+        self.count = 0
+        self.item.showGrid(x=True, y=True)
+        self.item.sigXRangeChanged.connect(self.xrange_changed)
+
+    def xrange_changed(self, viewBox, xrange):
+        if self.viewChanged is not None:
+            self.viewChanged()
+
+    def plot(self, x, y, style='-', color=None, width=None):
+        if color is None:
+            color = self.colors[self.count % len(self.colors)]
+            self.count += 1
+        pen = self.pyqtgraph.mkPen(color, width=width or 1, style=self.styles[style])
+        # Rows missing in a series (NaN) break the line instead of hiding all of it
+        return self.item.plot(np.asarray(x), np.asarray(y), pen=pen, connect='finite')
+
+    def set_data(self, handle, x, y):
+        handle.setData(np.asarray(x), np.asarray(y), connect='finite')
+
+    def color(self, handle):
+        return handle.opts['pen'].color().name()
+
+    def remove(self, handle):
+        self.item.removeItem(handle)
+
+    def labels(self, xlabel, ylabel):
+        self.item.setLabel('bottom', xlabel)
+        self.item.setLabel('left', ylabel)
+
+    def title(self, text, color='green'):
+        self.item.setTitle(text or None, color=color, size='9pt')
+
+    def clear(self):
+        self.item.clear()
+        self.item.setTitle(None)
+        self.count = 0
+
+    def autoscaled(self):
+        return bool(self.viewBox.autoRangeEnabled()[0])
+
+    def view(self):
+        return tuple(self.viewBox.viewRange()[0])
+
+    def width(self):
+        return self.viewBox.width() or self.widget.width()
+
+    # The view box follows the data by itself while it auto-ranges
+    def rescale(self):
+        pass
+
+    # Items repaint on their own once their data changed, a synchronous draw repaints the view at once
+    def draw(self, idle=False, layout=False):
+        if idle:
+            self.widget.viewport().update()
+        else:
+            with foamTrace.span('draw'):
+                self.widget.viewport().repaint()
+
+
+RENDERERS = {'matplotlib': MatplotlibRenderer, 'pyqtgraph': PyQtGraphRenderer}
@@ -0,0 +1,139 @@
+import os
+import json
+import time
+import threading
+from functools import wraps
+from collections import deque, defaultdict
+
+# Instrumentation of named spans (timed sections) and counters (bytes parsed, rows appended, ...)
+# Disabled by default: span() then returns a shared no-op context manager and count() returns at once, so the
+# instrumented code pays about one global lookup per call
+
+enabled = False
+# Finished spans (name, start, duration, thread, args) and counter samples (name, time, total), the oldest are dropped
+spans = deque(maxlen=200000)
+samples = deque(maxlen=200000)
+counters = defaultdict(float)
+# Duration of the last span of every name (e.g. for the overlay) and [calls, seconds] of all of them
+latest = {}
+totals = {}
+lock = threading.Lock()
+origin = time.perf_counter()
+
+
+def enable(on=True):
+    global enabled
+    enabled = on
+
+
+def reset():
+    with lock:
+        spans.clear()
+        samples.clear()
+        counters.clear()
+        latest.clear()
+        totals.clear()
+
+
+def now():
+    return time.perf_counter()
+
+
+# Record a span which started at <start> (from now()) and ends now, for sections which do not fit in a with block
+# (e.g. a refresh that spans a background load)
+def complete(name, start, **args):
+    if not enabled:
+        return
+    duration = time.perf_counter() - start
+    with lock:
+        spans.append((name, start, duration, threading.get_ident(), args))
+        latest[name] = duration
+        total = totals.setdefault(name, [0, 0.0])
+        total[0] += 1
+        total[1] += duration
+
+
+class Span:
+    __slots__ = ('name', 'args', 'start')
+
+    def __init__(self, name, args):
+        self.name = name
+        self.args = args
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        complete(self.name, self.start, **self.args)
+        return False
+
+
+class NullSpan:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+NULL = NullSpan()
+
+
+# Time a with block under <name>
+def span(name, **args):
+    return Span(name, args) if enabled else NULL
+
+
+# Time every call of the decorated function under <name>
+def traced(name):
+    def decorator(function):
+        @wraps(function)
+        def wrapper(*args, **kwargs):
+            if not enabled:
+                return function(*args, **kwargs)
+            with Span(name, {}):
+                return function(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def count(name, value=1):
+    if not enabled:
+        return
+    with lock:
+        counters[name] += value
+        samples.append((name, time.perf_counter(), counters[name]))
+
+
+# Calls, total, mean and maximum duration of every span name, and the counter totals
+def summary():
+    with lock:
+        stats = {}
+        for name, start, duration, thread, args in spans:
+            x = stats.setdefault(name, {'calls': 0, 'total': 0.0, 'max': 0.0})
+            x['calls'] += 1
+            x['total'] += duration
+            x['max'] = max(x['max'], duration)
+        for x in stats.values():
+            x['mean'] = x['total'] / x['calls']
+        return {'spans': stats, 'counters': dict(counters)}
+
+
+# Trace Event Format, which chrome://tracing and Perfetto open (times in microseconds)
+def chrome_trace():
+    pid = os.getpid()
+    with lock:
+        events = [{'name': name, 'ph': 'X', 'ts': (start - origin) * 1e6, 'dur': duration * 1e6, 'pid': pid,
+                   'tid': thread, 'args': args} for name, start, duration, thread, args in spans]
+        events += [{'name': name, 'ph': 'C', 'ts': (t - origin) * 1e6, 'pid': pid, 'args': {name: total}}
+                   for name, t, total in samples]
+    return {'traceEvents': events, 'displayTimeUnit': 'ms'}
+
+
+# Write the Chrome trace (format 'chrome') or the summary (format 'json') to <path>
+def export(path, format='chrome'):
+    with open(path, 'w') as f:
+        json.dump(chrome_trace() if format == 'chrome' else summary(), f)
@@ -0,0 +1,182 @@
+import os
+import time
+from functools import lru_cache
+
+from PyQt5.QtCore import QObject, QFileSystemWatcher, QTimer
+
+import foamTrace
+
+# File systems which deliver no (or unreliable) change notifications, their paths are polled in 'auto' mode
+NETWORK_FILESYSTEMS = {'nfs', 'nfs4', 'cifs', 'smb3', 'smbfs', 'lustre', 'gpfs', 'beegfs', 'panfs', 'fuse.sshfs',
+                       'fuse.glusterfs', '9p'}
+
+
+# Mount points and file system types of the system, read once
+@lru_cache(maxsize=1)
+def mounts():
+    result = []
+    try:
+        with open('/proc/mounts') as f:
+            for line in f:
+                fields = line.split()
+                if len(fields) >= 3:
+                    result.append((fields[1].replace('\\040', ' '), fields[2]))
+    except OSError:
+        pass
+    return result
+
+
+# File system type of the mount holding <path> (the longest matching mount point), '' when unknown
+def filesystem(path):
+    path = os.path.realpath(path)
+    best, kind = '', ''
+    for mount, fs in mounts():
+        if (path == mount or path.startswith(mount.rstrip('/') + '/')) and len(mount) > len(best):
+            best, kind = mount, fs
+    return kind
+
+
+# What identifies a state of a path: a new entry changes the mtime of a directory, an append the size of a file and
+# a replacement its inode. None when it does not exist
+def signature(path):
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return stat.st_mtime_ns, stat.st_size, stat.st_ino
+
+
+# Change detection for the watched directories and files of several consumers
+# In 'event' mode the kernel notifications of QFileSystemWatcher are used, in 'poll' mode the paths are stat-ed at an
+# adaptive interval (short while they change, longer while they are idle), and 'auto' polls only the paths on network
+# file systems (NFS, Lustre, ...) which deliver no events. Bursts of events are coalesced with an adaptive debounce and
+# every tick calls each consumer once with the sorted directories and files whose signature changed since the last one
+class ChangeWatcher(QObject):
+    def __init__(self, mode='auto', debounce=(0.05, 1.0), interval=(0.25, 5.0), parent=None):
+        super().__init__(parent)
+        self.mode = mode
+        self.minDelay, self.maxDelay = debounce
+        self.minInterval, self.maxInterval = interval
+        self.delay = self.minDelay
+        self.interval = self.minInterval
+        # Watched (directories, files) of every consumer callback
+        self.consumers = {}
+        # Last signature of every watched path, changes are reported against it
+        self.signatures = {}
+        # Watched paths checked by polling instead of events
+        self.polled = set()
+        # Paths with events since the last tick, and when the first of them arrived
+        self.pending = set()
+        self.first = None
+
+        self.watcher = QFileSystemWatcher()
+        self.watcher.fileChanged.connect(self.path_changed)
+        self.watcher.directoryChanged.connect(self.path_changed)
+        self.debounceTimer = QTimer(self)
+        self.debounceTimer.setSingleShot(True)
+        self.debounceTimer.timeout.connect(self.tick)
+        self.pollTimer = QTimer(self)
+        self.pollTimer.setSingleShot(True)
+        self.pollTimer.timeout.connect(self.poll)
+
+    # Whether <path> is polled instead of watched through events
+    def polls(self, path):
+        return self.mode == 'poll' or (self.mode == 'auto' and filesystem(path) in NETWORK_FILESYSTEMS)
+
+    # Add directories and files to the paths watched for the consumer <callback>(directories, files)
+    def watch(self, callback, directories=(), files=()):
+        interest = self.consumers.setdefault(callback, (set(), set()))
+        for paths, watched in zip((directories, files), interest):
+            for path in paths:
+                watched.add(path)
+                self.add(path)
+
+    def unwatch(self, callback, directories=(), files=()):
+        interest = self.consumers.get(callback, (set(), set()))
+        for paths, watched in zip((directories, files), interest):
+            for path in paths:
+                watched.discard(path)
+                self.release(path)
+
+    # Replace the files watched for <callback>
+    def set_files(self, callback, files):
+        files = set(files)
+        watched = self.consumers.get(callback, (set(), set()))[1]
+        self.unwatch(callback, files=watched - files)
+        self.watch(callback, files=files - watched)
+
+    def directories(self):
+        return sorted(set().union(*[x[0] for x in self.consumers.values()]))
+
+    def files(self):
+        return sorted(set().union(*[x[1] for x in self.consumers.values()]))
+
+    def add(self, path):
+        if path in self.signatures:
+            return
+        self.signatures[path] = signature(path)
+        if self.polls(path):
+            self.polled.add(path)
+            if not self.pollTimer.isActive():
+                self.interval = self.minInterval
+                self.pollTimer.start(int(1000 * self.interval))
+        elif self.signatures[path] is not None:
+            self.watcher.addPath(path)
+
+    # Stop watching a path which no consumer needs anymore
+    def release(self, path):
+        if any(path in x[0] or path in x[1] for x in self.consumers.values()):
+            return
+        self.signatures.pop(path, None)
+        self.polled.discard(path)
+        if path in self.watcher.files() or path in self.watcher.directories():
+            self.watcher.removePath(path)
+
+    # Collect an event, a burst of events (the solver writing several files) postpones the tick further each time,
+    # up to maxDelay after its first event so that a continuous burst still refreshes
+    def path_changed(self, path):
+        now = time.monotonic()
+        foamTrace.count('watcher_events')
+        self.pending.add(path)
+        if self.first is None:
+            self.first = now
+        elif self.debounceTimer.isActive():
+            self.delay = min(2 * self.delay, self.maxDelay)
+        self.debounceTimer.start(int(1000 * min(self.delay, max(0.0, self.first + self.maxDelay - now))))
+
+    # Check the signatures of the polled paths, the changed ones go through the same debounce as events
+    def poll(self):
+        changed = [x for x in self.polled if signature(x) != self.signatures.get(x)]
+        for path in changed:
+            self.path_changed(path)
+        # Poll often while the paths change and back off while they are idle
+        self.interval = self.minInterval if changed else min(1.5 * self.interval, self.maxInterval)
+        if self.polled:
+            self.pollTimer.start(int(1000 * self.interval))
+
+    # Report the paths whose signature changed since the last tick to the consumers watching them
+    def tick(self):
+        pending, self.pending, self.first = self.pending, set(), None
+        # The delay shrinks back after every tick, so that isolated events are reported quickly
+        self.delay = max(self.minDelay, self.delay / 2)
+        # A directory event may also stand for the watched files inside it (e.g. a file replaced by a rename)
+        candidates = pending | {x for x in self.signatures if os.path.dirname(x) in pending}
+        changed = set()
+        for path in candidates:
+            if path not in self.signatures:
+                continue
+            current = signature(path)
+            if current != self.signatures[path]:
+                changed.add(path)
+                self.signatures[path] = current
+            # The kernel drops the watch of a replaced or removed path, watch it again
+            if (current is not None and path not in self.polled and path not in self.watcher.files() and
+                    path not in self.watcher.directories()):
+                self.watcher.addPath(path)
+        foamTrace.count('watcher_ticks')
+        foamTrace.count('watcher_changes', len(changed))
+        if not changed:
+            return
+        for callback, (directories, files) in list(self.consumers.items()):
+            if changed & directories or changed & files:
+                callback(sorted(changed & directories), sorted(changed & files))
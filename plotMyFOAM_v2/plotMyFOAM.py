@@ -1,78 +1,83 @@
 import os
-import glob
-import time
-import numpy as np
-import pandas as pd
+import sys
+import argparse
+import threading
+from functools import partial
+
+import foamTrace
+from foamWatch import ChangeWatcher
 
 from PyQt5.QtWidgets import QWidget, QComboBox, QPushButton, QCheckBox, QHBoxLayout, QVBoxLayout, QFileDialog, \
-    QApplication
-from PyQt5.QtCore import QRect, QFileSystemWatcher, QTimer
+    QApplication, QProgressBar, QLabel, QCompleter
+from PyQt5.QtCore import Qt, QRect, QObject, QRunnable, QThreadPool, QTimer, pyqtSignal
 from PyQt5.QtGui import QIcon, QPixmap
 
-import matplotlib.pyplot as plt
-from matplotlib.backends.backend_qt5agg import FigureCanvasQTAgg as FigureCanvas, \
-    NavigationToolbar2QT as NavigationToolbar
 
-import matplotlib
+# NumPy, the data modules and matplotlib take most of the startup time, they are imported on first use (once the
+# window is shown, see Widget.setup_plot) instead of before the window appears
+def import_modules():
+    global np, Line, LineCache, CaseIndex, LoadCancelled, load_lines, decimate, LogLine, FIELDS, find_logs, is_log, \
+        RENDERERS
+    import numpy as np
+    from foamData import Line, LineCache, CaseIndex, LoadCancelled, load_lines, decimate
+    from foamLog import LogLine, FIELDS, find_logs, is_log
+    from foamRender import RENDERERS
 
-matplotlib.use('Qt5Agg')
 
-class Line:
-    def __init__(self, maindir, folder, field, timeNames=None):
+class LoadSignals(QObject):
+    progress = pyqtSignal(int, int)
+    finished = pyqtSignal(object)
+    failed = pyqtSignal(str)
 
-        # Read data
-        self.read_data(maindir, folder, field, timeNames)
 
-    def read_data(self, maindir, folder, field, timeNames=None):
+# Run <function>(*args, cancelled=..., progress=...) on a QThreadPool thread and hand the result back through signals
+class LoadWorker(QRunnable):
+    def __init__(self, function, *args):
+        super().__init__()
+        self.setAutoDelete(False)
+        self.function = function
+        self.args = args
+        self.cancelled = threading.Event()
+        self.signals = LoadSignals()
 
-        start = time.time()
+    def run(self):
+        try:
+            result = self.function(*self.args, cancelled=self.cancelled, progress=self.signals.progress.emit)
+        except LoadCancelled:
+            result = None
+        except Exception as error:
+            self.signals.failed.emit(repr(error))
+            return
+        self.signals.finished.emit(result)
 
-        if timeNames is None:
-            self.timeNames = []
-        else:
-            self.timeNames = timeNames
-
-        self.maindir = maindir
-        self.folder = folder
-        self.field = field
-
-        # Retrieve a list of valid file paths
-        self.fileList = [os.path.join(maindir, folder, x, field) for x in self.timeNames if
-                         os.path.isfile(os.path.join(maindir, folder, x, field))]
-        # Compute number of rows to skip (OpenFOAM header)  (will work only for a maximum of <nrows> to skip)
-        self.rows2skip = \
-            int(pd.read_table(self.fileList[0], sep="\s+", usecols=[0], nrows=50, index_col=False).value_counts()['#'])
-        # Retrieve data file modified header
-        self.header = pd.read_table(self.fileList[0], sep="\s+", nrows=0, skiprows=self.rows2skip).columns[1:]
-
-        dataList = []
-        for x in range(len(self.fileList)):
-            data = pd.read_table(self.fileList[x], sep="\s+", header=self.rows2skip,
-                                 usecols=range(len(self.header)), names=self.header).fillna(0)
-            dataList += [data]
-            if x == len(self.fileList) - 1:
-                # Record file height for reread function
-                self.height = len(data)
-        self.data = pd.concat(dataList, ignore_index=True)
-
-        end = time.time()
-        print('Line method: read_data() time = ' + str(end - start))
-
-    def re_read_data(self, tail):
-        data = pd.read_table(self.fileList[-1], sep="\s+", header=self.rows2skip, usecols=range(len(self.header)),
-                             names=self.header, dtype="float32").tail(tail).fillna(0)
-        # Update dataframe height
-        self.height = len(data)
-        self.data = pd.concat([self.data, data], ignore_index=True)
-
-    def is_plotted(self, column, value):
-        self.plottedColumns[column] = value
-
-    def reset_plottedColumns(self):
-        self.plottedColumns = list(bytearray(len(self.header)))
+    def cancel(self):
+        self.cancelled.set()
 
 
 class Widget(QWidget):
+    # Change detection mode of the session: 'event', 'poll' or 'auto' (polls only the network file systems)
+    watchMode = 'auto'
+    # Show the refresh latency, draw time and parse throughput over the plot (enables the instrumentation)
+    overlay = False
+    # Memory budget of the data of all lines, the least recently used unplotted lines are evicted beyond it
+    memoryBudget = 2 * 1024 ** 3
+    # Trailing window (rows) of the rolling mean and standard deviation drawn with every column (0 draws none), and
+    # relative change of the mean over the window below which a column is flagged as converged (0 flags none)
+    window = 0
+    threshold = 0.0
+    # Follow the tail: read only the last rows or the last span of time of new lines (0 reads all), the older rows are
+    # read once the view is panned or zoomed before them
+    followRows = 0
+    followSpan = 0.0
+    # Reader options of the session, applied once the data modules are imported: size limit of the parse cache in
+    # bytes (None disables it), storage type of the data columns and number of threads reading the time files of a
+    # field (None keeps the default of Line)
+    cacheSize = 1024 ** 3
+    dtype = 'float64'
+    readThreads = None
+    # Rendering backend of the plot, one of foamRender.RENDERERS ('pyqtgraph' redraws many refreshing lines faster)
+    backend = 'matplotlib'
+
     def __init__(self, parent=None):
         super().__init__(parent)
 
@@ -80,14 +85,17 @@ class Widget(QWidget):
         self.maindir = None
         self.setGeometry(275, 150, 1536, 512)  # Set the main-window position (x, y) and size (w, h)
         self.setWindowTitle('plotMyFOAM')
-        appIcon = QPixmap("./plotMyFOAM.png").scaled(100, 100, 1,
-                                                     1)  # (Width, height, scaleFactorMode, smoothPictureMode)
-        self.setWindowIcon(QIcon(appIcon))
 
-        # Declare figure axes and widget for plotting and displaying the figure
-        self.fig, self.ax = plt.subplots()
-        self.figure_widget = FigureCanvas(self.fig)
-        plt.tight_layout()
+        # The renderer is built once the window was painted (see setup_plot), an empty widget holds its place until then
+        self.renderer = None
+        self.figure_widget = QWidget()
+        # Line handle (of the renderer) and drawn line generation of every plotted (line, column), decimated again when
+        # the view changes
+        self.artists = {}
+        # Rolling mean, mean - std and mean + std handles of every plotted (line, column)
+        self.derived = {}
+        # Range of time the lines are decimated over (all their rows while the view follows the data)
+        self.decimatedView = (float('-inf'), float('inf'))
 
         # Declare combo box widgets
         comboWidgetList = ['case', 'folder', 'field', 'column']
@@ -107,25 +115,15 @@ class Widget(QWidget):
             self.__dict__[x] = QPushButton(y)
             self.__dict__[x].setToolTip(z)
 
+        # The icons are loaded with the figure (see setup_plot)
         self.findFolderButton.setFlat(True)
-        self.imageFindFolder = QPixmap("./open-folder.png").scaled(20, 20, 1, 1)
-        self.findFolderButton.setIcon(QIcon(self.imageFindFolder))
-        self.findFolderButton.setIconSize(self.imageFindFolder.rect().size())
-
         self.clearPlotButton.setFlat(True)
-        self.imageClearPlot = QPixmap("./paint-roller.png").scaled(20, 20, 1, 1)
-        self.clearPlotButton.setIcon(QIcon(self.imageClearPlot))
-        self.clearPlotButton.setIconSize(self.imageClearPlot.rect().size())
-
         self.updatePlotButton.setFlat(True)
-        self.imageReload = QPixmap("./reload.png").scaled(20, 20, 1, 1)
-        self.updatePlotButton.setIcon(QIcon(self.imageReload))
-        self.updatePlotButton.setIconSize(self.imageReload.rect().size())
         self.updatePlotButton.setEnabled(False)
 
         # Declare other widgets
-        self.toolbar = NavigationToolbar(self.figure_widget, self)
-        self.watcher = QFileSystemWatcher([])
+        # Watch directories for new times and only the growing last file of every plotted line
+        self.watcher = ChangeWatcher(self.watchMode)
 
         self.checkBox = QCheckBox()
         self.checkBox.setGeometry(QRect(190, 80, 41, 22))
@@ -134,8 +132,25 @@ class Widget(QWidget):
                                     "QCheckBox::indicator:checked {image: url(./switch-on.png);}")
         self.checkBox.setToolTip('Enable/disable automatic refresher')
 
-        self.timer = QTimer()
-        self.timer.setSingleShot(True)
+        # Declare the background loader (a single thread, so that loads of the same Line never overlap)
+        self.pool = QThreadPool()
+        self.pool.setMaxThreadCount(1)
+        self.workers = []
+        self.worker = None  # Current user requested load, cancelled when the selection changes
+        self.refresher = None  # Current refresh of the plotted lines
+
+        self.progressBar = QProgressBar()
+        self.progressBar.setMaximumWidth(120)
+        self.progressBar.setTextVisible(False)
+        self.progressBar.setToolTip('Reading data files')
+        self.progressBar.hide()
+
+        # Declare the optional instrumentation overlay, updated twice per second (its label is put over the figure)
+        self.overlayTimer = QTimer()
+        self.overlayTimer.timeout.connect(self.update_overlay)
+        if self.overlay:
+            foamTrace.enable()
+        self.refreshStart = None
 
         # Declare file dialog widget
         self.dialog = QFileDialog(self, directory='~', caption='Open data file')
@@ -144,7 +159,7 @@ class Widget(QWidget):
 
         # Define widget layout
         vlayout = QVBoxLayout(self)
-        hlayout = QHBoxLayout()
+        self.hlayout = hlayout = QHBoxLayout()
         # Add widgets to horizontal layout
         hWidgetList = ['findFolderButton',
                        'caseCombo',
@@ -154,7 +169,7 @@ class Widget(QWidget):
                        'clearPlotButton',
                        'updatePlotButton',
                        'checkBox',
-                       'toolbar']  # @@@ Merge the two lists and find a way to index the order
+                       'progressBar']  # @@@ Merge the two lists and find a way to index the order
 
         for x in hWidgetList:
             hlayout.addWidget(self.__dict__[x])
@@ -165,9 +180,68 @@ class Widget(QWidget):
 
         # Declare this global variable
         self.line = []
+        self.lineCache = None
+        self.historyRequests = set()
         self.modifiedFiles = []
         self.updateTimesList = []
         self.case_dict = {}
+        self.indexes = {}
+
+    # Build the plot and everything which needs NumPy, the data modules or matplotlib after the first paint, so that
+    # the window and combos show before they are imported. The widget signals are connected at the end, the widgets
+    # do not react until then
+    def paintEvent(self, event):
+        super().paintEvent(event)
+        if self.renderer is None:
+            QTimer.singleShot(0, self.setup_plot)
+
+    @foamTrace.traced('setup_plot')
+    def setup_plot(self):
+        if self.renderer is not None:
+            return
+        import_modules()
+
+        # Apply the reader options of the session
+        if self.cacheSize is None:
+            Line.cache = None
+        elif Line.cache is not None:
+            Line.cache.maxBytes = self.cacheSize
+        Line.dtype = np.dtype(self.dtype)
+        if self.readThreads is not None:
+            Line.readThreads = self.readThreads
+        self.lineCache = LineCache(self.memoryBudget)
+
+        appIcon = QPixmap("./plotMyFOAM.png").scaled(100, 100, 1,
+                                                     1)  # (Width, height, scaleFactorMode, smoothPictureMode)
+        self.setWindowIcon(QIcon(appIcon))
+        self.imageFindFolder = QPixmap("./open-folder.png").scaled(20, 20, 1, 1)
+        self.findFolderButton.setIcon(QIcon(self.imageFindFolder))
+        self.findFolderButton.setIconSize(self.imageFindFolder.rect().size())
+        self.imageClearPlot = QPixmap("./paint-roller.png").scaled(20, 20, 1, 1)
+        self.clearPlotButton.setIcon(QIcon(self.imageClearPlot))
+        self.clearPlotButton.setIconSize(self.imageClearPlot.rect().size())
+        self.imageReload = QPixmap("./reload.png").scaled(20, 20, 1, 1)
+        self.updatePlotButton.setIcon(QIcon(self.imageReload))
+        self.updatePlotButton.setIconSize(self.imageReload.rect().size())
+
+        # Declare the renderer of the plot (see foamRender) and display its widget in place of the empty widget
+        self.renderer = RENDERERS[self.backend](self)
+        self.renderer.viewChanged = self.xlim_changed
+        placeholder, self.figure_widget = self.figure_widget, self.renderer.widget
+        self.layout().replaceWidget(placeholder, self.figure_widget)
+        placeholder.deleteLater()
+        # The toolbar follows the other widgets of the horizontal layout (before its stretch)
+        self.toolbar = self.renderer.toolbar
+        if self.toolbar is not None:
+            self.hlayout.insertWidget(self.hlayout.count() - 1, self.toolbar)
+
+        self.overlayLabel = QLabel(self.figure_widget)
+        self.overlayLabel.setStyleSheet('background-color: rgba(255, 255, 255, 200); font-family: monospace; '
+                                        'padding: 4px;')
+        self.overlayLabel.move(8, 8)
+        self.overlayLabel.setVisible(self.overlay)
+        if self.overlay:
+            self.overlayTimer.start(500)
 
         # Connect widget signals to the appropriate functions       #@@@ Add a loop here maybe?
         self.caseCombo.textActivated.connect(self.case_changed)
@@ -175,56 +249,74 @@ class Widget(QWidget):
         self.fieldCombo.textActivated.connect(self.field_changed)
         self.columnCombo.textActivated.connect(self.column_changed)
         self.findFolderButton.clicked.connect(self.select_dir)
-        self.clearPlotButton.clicked.connect(self.clear_plot)
-        self.updatePlotButton.clicked.connect(self.update_plot)
-        self.watcher.fileChanged.connect(self.file_modification_update_1)
-        self.watcher.directoryChanged.connect(self.dir_modification_update)
+        # clicked passes a checked flag, which the traced slots would forward (they accept any arguments)
+        self.clearPlotButton.clicked.connect(lambda: self.clear_plot())
+        self.updatePlotButton.clicked.connect(lambda: self.update_plot())
         self.checkBox.stateChanged.connect(self.checkBox_State)
-        self.timer.timeout.connect(self.file_modification_update_2)
 
-    def dir_modification_update(self, path):
+    # Apply the change set of one watcher tick: the modified data files first, then the directories with new entries
+    @foamTrace.traced('paths_changed')
+    def paths_changed(self, directories, files):
+        for path in files:
+            self.file_modification_update_1(path)
+        for path in directories:
+            self.dir_modification_update(path)
+        # Refresh (or enable the update button) once for the whole tick
+        if self.modifiedFiles:
+            self.file_modification_update_2()
+
+    # Watch the last time file of every plotted line (the only one that grows)
+    def watch_lines(self):
+        self.watcher.set_files(self.paths_changed, [x.fileList[-1] for x in self.line if sum(x.plottedColumns) > 0])
 
-        print(self.line_x.timeNames)
+    def dir_modification_update(self, path):
 
         print('\nA directory was modifed\n'+path)
         print('Directories: ' + str(self.watcher.directories()) + ' are being watched')
 
         maindir = os.path.join(path.split('/postProcessing')[0], 'postProcessing')
-        folder = os.path.basename(path)
-        self.folderNames = np.unique([os.path.basename(x) for x in glob.glob(maindir + '/*')])
-        self.timeNames = np.unique([os.path.basename(x) for x in glob.glob(maindir + 2 * '/*')])
-        self.fileNames = np.unique([os.path.basename(x) for x in glob.glob(maindir + 3 * '/*')])
-
-        if path == maindir:
-            for folder in self.folderNames:
-                fieldname = os.path.join(self.maindir, folder)
-                if os.path.isdir(fieldname) and folder not in [self.folderCombo.itemText(i) for i in range(self.folderCombo.count())]:
-                    self.folderCombo.addItem(folder)
-
-        for field in self.fileNames:
-            for x in self.timeNames:
-                filename = os.path.join(self.maindir, self.folderCombo.currentText(), x, field)
-                if os.path.isfile(filename) and field not in [self.fieldCombo.itemText(i) for i in range(self.fieldCombo.count())]:
-                    self.fieldCombo.addItem(field)
+        # Rescan only the modified directory of that case
+        index = self.case_index(maindir)
+        index.update(path)
+
+        # Apply only to the case shown in the combo boxes
+        if maindir == self.maindir:
+            if path == maindir:
+                items = {self.folderCombo.itemText(i) for i in range(self.folderCombo.count())}
+                self.folderCombo.addItems([x for x in index.folders() if x not in items])
+            items = {self.fieldCombo.itemText(i) for i in range(self.fieldCombo.count())}
+            self.fieldCombo.addItems([x for x in index.fields(self.folderCombo.currentText()) if x not in items])
 
         flag = False
         for x in self.line:
             # Apply when times were added and at least one column is plotted # @@@ Does this leave space for data which does not get refreshed?
             # This assumes that times are not deleted, therefore the length always increases
-            if (maindir, folder) == (x.maindir, x.folder) and len(self.timeNames) > len(x.fileList):
+            if maindir == x.maindir and len(index.times(x.folder, x.field)) > len(x.fileList):
+                # Mark the line to be read again with the new times
+                if x not in self.updateTimesList:
+                    self.updateTimesList.append(x)
                 # Apply only if the automatic refresher is on and there are plotted columns
                 if self.checkBox.checkState() and sum(x.plottedColumns) > 0:
-                    # Read the data, update the global line pointer, and activate the flag
-                    x.read_data(x.maindir, x.folder, x.field, self.timeNames)
-                    self.line_x = x
+                    # Activate the flag
                     flag = True
                 else:
                     # Set button state to enabled
                     self.updatePlotButton.setEnabled(True)
-                    self.updateTimesList.append(x)
-        # Trigger the replot if the flag was activated
+        # Trigger the background read and replot if the flag was activated
         if flag:
-            self.re_plot_data()
+            self.update_plot()
+
+    # Keep the data of all lines within the memory budget, the selected line and the plotted lines are kept
+    def trim_lines(self):
+        keep = [x for x in self.line if sum(x.plottedColumns) > 0] + [self.line_x]
+        for x in self.lineCache.trim(self.line, keep):
+            print('Line: ' + os.path.join(x.maindir, x.folder, x.field) + ' was evicted from memory')
+
+    # Return the folder/time/file index of a case, creating it on first use
+    def case_index(self, maindir):
+        if maindir not in self.indexes:
+            self.indexes[maindir] = CaseIndex(maindir)
+        return self.indexes[maindir]
 
     # Function to select the case directory through the file dialog
     def select_dir(self):
@@ -234,6 +326,8 @@ class Widget(QWidget):
             print('\nCurrent case: ' + os.path.basename(self.dialog.selectedFiles()[0]) + '\n')
             # Define folder, time and file lists
             if os.path.isdir(os.path.join(self.dialog.selectedFiles()[0], 'postProcessing')):
+                # Stop reading the previous selection
+                self.cancel_load()
                 # Add option to the case combo box
                 self.caseCombo.addItem(os.path.basename(self.dialog.selectedFiles()[0]))
                 self.caseCombo.setCurrentIndex(-1)
@@ -244,267 +338,390 @@ class Widget(QWidget):
                 # Add the full path to the case dictionary in the event the case combo box is triggered
                 self.case_dict[os.path.basename(self.dialog.selectedFiles()[0])] = self.maindir
                 # Add the main directory to the folder watch list
-                self.watcher.addPath(self.maindir)
-                # Create the names of some auxiliary lists
-                comboList = ['folder', 'time', 'file']
-                fieldList = [x + 'List' for x in comboList]
-                fieldNames = [x + 'Names' for x in comboList]
-                # Retrieve folder and file names from OpenFOAM postProcessing
-                for f in range(len(fieldList)):
-                    self.__dict__[fieldNames[f]] = np.unique([os.path.basename(x) for x in glob.glob(self.maindir + (f + 1) * '/*')])
+                self.watcher.watch(self.paths_changed, directories=[self.maindir])
+                # Index the folders, times and files of OpenFOAM postProcessing
+                self.indexes[self.maindir] = CaseIndex(self.maindir)
                 # Clear combo boxes and add dummy options (except for the case combo box)
                 [self.__dict__[x].clear() for x in self.comboWidgetList[1:]]
-                # Add options to folder combo box
-                for folder in self.folderNames:
-                    fieldname = os.path.join(self.maindir, folder)
-                    if os.path.isdir(fieldname):
-                        self.folderCombo.addItem(folder)
+                # Add options to folder combo box (the solver logs of the case after the function objects)
+                self.folderCombo.addItems(self.indexes[self.maindir].folders() + find_logs(self.maindir))
                 self.folderCombo.setCurrentIndex(-1)
             else:
                 print('\n_error_#01: the chosen directory does not CONTAIN a "postProcessing" folder\n')
 
+    @foamTrace.traced('case_changed')
     def case_changed(self, case):
-        print('CASE CHANGED')
-        case_changed_start = time.time()
-
+        # Stop reading the previous selection
+        self.cancel_load()
         self.maindir = self.case_dict[case]
         # Create another variable to keep the last accepted folder, in case of the dialog cancellation
         self.currentMaindir = self.maindir
-        comboList = ['folder', 'time', 'file']
-        fieldList = [x + 'List' for x in comboList]
-        fieldNames = [x + 'Names' for x in comboList]
-        # Retrieve folder and file names from OpenFOAM postProcessing
-        for f in range(len(fieldList)):
-            self.__dict__[fieldNames[f]] = np.unique(
-                [os.path.basename(x) for x in glob.glob(self.maindir + (f + 1) * '/*')])
+        # Index the folders, times and files of OpenFOAM postProcessing again (the case may not be watched)
+        self.indexes[self.maindir] = CaseIndex(self.maindir)
         # Clear combo boxes and add dummy options
         [self.__dict__[x].clear() for x in self.comboWidgetList[1:]]
-        # Add options to folder combo box
-        for folder in self.folderNames:
-            fieldname = os.path.join(self.maindir, folder)
-            if os.path.isdir(fieldname):
-                self.folderCombo.addItem(folder)
+        # Add options to folder combo box (the solver logs of the case after the function objects)
+        self.folderCombo.addItems(self.indexes[self.maindir].folders() + find_logs(self.maindir))
         self.folderCombo.setCurrentIndex(-1)
 
-        case_changed_end = time.time()
-        print('CASE CHANGED time = ' + str(case_changed_end - case_changed_start))
-
     # Function to connect the folder combo box options to the file combo box options
+    @foamTrace.traced('folder_changed')
     def folder_changed(self, folder):
-        print('FOLDER CHANGED')
-        folder_changed_start = time.time()
-
         self.folder = folder  # @@@ Is there a way to eliminate this line?
+        # Stop reading the previous selection
+        self.cancel_load()
         # Clear file and column combo boxes
         [self.__dict__[x].clear() for x in self.comboWidgetList[2:]]
-        # Add options to file combo box
-        for field in self.fileNames:
-            for x in self.timeNames:
-                filename = os.path.join(self.maindir, folder, x, field)
-                if os.path.isfile(filename) and field not in [self.fieldCombo.itemText(i) for i in range(self.fieldCombo.count())]:
-                    self.fieldCombo.addItem(field)
+        # Add options to file combo box (the series parsed from a solver log)
+        self.fieldCombo.addItems(FIELDS if is_log(folder) else self.case_index(self.maindir).fields(folder))
         self.fieldCombo.setCurrentIndex(-1)
 
-        folder_changed_end = time.time()
-        print('FOLDER CHANGED time = ' + str(folder_changed_end - folder_changed_start))
-
     # Function to read all files from different time folders, and of the same field, and concatenate the data
-    def read_data(self):
-        print('READ DATA')
-        read_data_start = time.time()
-
+    # The files are read in the background and <then> is called once the selected line holds the new data
+    def read_data(self, then=None):
+        read_data_start = foamTrace.now()
+
+        # Only the last requested selection is read
+        self.cancel_load()
+        # Read the times holding the selected field (a solver log has none)
+        self.timeNames = self.case_index(self.maindir).times(self.folder, self.field)
+        log = is_log(self.folder)
         # Check if any Line instance is about to get duplicated
         which_line = list(map(lambda x: (self.line[x].maindir, self.line[x].folder, self.line[x].field) == (
             self.maindir, self.folder, self.field), range(len(self.line))))
         # Apply when there are plotted columns
         if sum(which_line) > 0:
-            # Define pointer for selected line
-            self.line_x = self.line[np.where(which_line)[0][0]]
-            # Read the new data associated to that line and replace the old data
-            self.line_x.read_data(self.maindir, self.folder, self.field,
-                                  self.timeNames)  # @@@ This line should not execute unless a file is modified
+            line = self.line[np.where(which_line)[0][0]]
+
+            def finished(state):
+                # Replace the old data and define pointer for selected line
+                line.apply(state)
+                self.line_x = line
+                self.lineCache.touch(line)
+                self.trim_lines()
+                foamTrace.complete('read_data', read_data_start)
+                if then is not None:
+                    then()
+
+            # Read the new data associated to that line
+            self.worker = self.load(line.load, (self.maindir, self.folder, self.field, self.timeNames),
+                                    finished)  # @@@ This line should not execute unless a file is modified
         else:
-            # Read the new data associated to that line and add the new line
-            self.line.append(Line(self.maindir, self.folder, self.field, self.timeNames))
-            # Initialize the plottedColumns list as bool(zeros)
-            self.line[-1].reset_plottedColumns()
-            # Define pointer for selected line
-            self.line_x = self.line[-1]
-
-        read_data_end = time.time()
-        print('READ DATA time = ' + str(read_data_end - read_data_start))
+            def finished(line):
+                # Add the new line and initialize the plottedColumns list as bool(zeros)
+                self.line.append(line)
+                line.reset_plottedColumns()
+                # Define pointer for selected line
+                self.line_x = line
+                self.lineCache.touch(line)
+                self.trim_lines()
+                foamTrace.complete('read_data', read_data_start)
+                if then is not None:
+                    then()
+
+            # Read the new data associated to that line (or only its last rows when following the tail)
+            # Solver logs are parsed from their checkpoint, which already reads only the new content
+            function = LogLine if log else Line
+            if not log and (self.followRows > 0 or self.followSpan > 0):
+                function = partial(Line, follow=(self.followRows or None, self.followSpan or None))
+            self.worker = self.load(function, (self.maindir, self.folder, self.field, self.timeNames), finished)
+
+    # Start <function>(*args) on the background thread and call <then> with its result on the GUI thread
+    def load(self, function, args, then):
+        worker = LoadWorker(function, *args)
+        worker.signals.progress.connect(self.load_progress)
+        worker.signals.finished.connect(lambda result: self.load_finished(worker, result, then))
+        worker.signals.failed.connect(lambda message: self.load_failed(worker, message))
+        self.workers.append(worker)
+        self.progressBar.setRange(0, 0)
+        self.progressBar.show()
+        self.pool.start(worker)
+        return worker
+
+    # Cancel the user requested load, its result will be discarded
+    def cancel_load(self):
+        if self.worker is not None:
+            self.worker.cancel()
+            self.worker = None
+
+    def load_progress(self, done, total):
+        self.progressBar.setRange(0, total)
+        self.progressBar.setValue(done)
+
+    def load_finished(self, worker, result, then):
+        self.workers.remove(worker)
+        if not self.workers:
+            self.progressBar.hide()
+        if worker is self.worker:
+            self.worker = None
+        if worker is self.refresher:
+            self.refresher = None
+        # Discard the results of cancelled loads
+        if not worker.cancelled.is_set():
+            then(result)
+
+    def load_failed(self, worker, message):
+        print('\n_error_#02: the data files could not be read (' + message + ')\n')
+        worker.cancel()
+        self.load_finished(worker, None, None)
 
     # Function to trigger the draw
+    @foamTrace.traced('plot_data')
     def plot_data(self):
-        print('PLOT DATA')
-        plot_data_start = time.time()
-
-        # Update the times for unplotted lines
-        if self.line_x in self.updateTimesList:
-            self.read_data()
-            self.updateTimesList.remove(self.line_x)
+        # Update the times for unplotted lines, or load an evicted line again (and plot once they are read)
+        if self.line_x in self.updateTimesList or self.line_x.data is None:
+            if self.line_x in self.updateTimesList:
+                self.updateTimesList.remove(self.line_x)
+            self.read_data(self.plot_data)
+            return
+
+        # Only the plotted and requested columns are in memory, fetch the selected one first (and plot once it is read)
+        # Columns of wide lines are copied at once from their memory-mapped segments
+        if not self.line_x.has_column(self.column) and self.line_x.wide:
+            self.line_x.apply(self.line_x.load_columns([self.column]))
+            self.trim_lines()
+        elif not self.line_x.has_column(self.column):
+            line = self.line_x
+
+            def finished(state):
+                line.apply(state)
+                self.trim_lines()
+                self.plot_data()
+
+            self.worker = self.load(line.load_columns, ([self.column],), finished)
+            return
 
         # Apply only to columns that are not plotted
-        if not self.line_x.plottedColumns[self.line_x.header.get_loc(self.column)]:
+        if not self.line_x.plottedColumns[self.line_x.header.index(self.column)]:
             # Actual plot commands
-            self.line_x.data.plot(x=self.line_x.header[0], y=self.column, ax=self.ax, legend=False, grid=True)
+            self.plot_column(self.line_x, self.column)
+            self.show_convergence()
             # Define labels
-            self.ax.set_ylabel(self.line_x.field + ' - Column: ' + self.column)
-            self.ax.set_xlabel(self.line_x.header[1])
+            self.renderer.labels(self.line_x.header[1], self.line_x.field + ' - Column: ' + self.column)
             # Declare tight limits and trigger the draw
-            plt.tight_layout()
-            self.fig.canvas.draw()
+            self.renderer.draw(layout=True)
             # Indicate the column as plotted
-            self.line_x.is_plotted(self.line_x.header.get_loc(self.column), 1)
+            self.line_x.is_plotted(self.line_x.header.index(self.column), 1)
         else:
             print("The requested line is already plotted.")
         print('plotted columns = ' + str(self.line_x.plottedColumns))
-        # Add all times to the file watcher list
-        self.watcher.addPath(os.path.join(self.maindir, self.folder))
-        self.watcher.addPaths(self.line_x.fileList)
+        # Watch the folder for new times and the growing file of the line (a solver log is the growing file itself)
+        if not is_log(self.folder):
+            self.watcher.watch(self.paths_changed, directories=[os.path.join(self.maindir, self.folder)])
+        self.watch_lines()
         print('Directories: ' + str(self.watcher.directories()) + ' are being watched')
         print('Files: ' + str(self.watcher.files()) + ' are being watched')
 
-        plot_data_end = time.time()
-        print('PLOT DATA time = ' + str(plot_data_end - plot_data_start))
+    # Draw one column of a line against time, decimated to the width of the plot
+    # The line handle is kept for the (line, column) pair and later refreshes only replace its data
+    def plot_column(self, line, column):
+        # Decimate over the whole series unless the user zoomed or panned (which turns autoscaling off)
+        if self.renderer.autoscaled():
+            xmin, xmax = -np.inf, np.inf
+        else:
+            xmin, xmax = self.renderer.view()
+        width = self.renderer.width()
+        x, y = decimate(line.data.column(line.header[0]), line.data.column(column), xmin, xmax, width)
+        if (line, column) in self.artists:
+            self.renderer.set_data(self.artists[(line, column)][0], x, y)
+        else:
+            self.artists[(line, column)] = [self.renderer.plot(x, y), None]
+        # Record which state of the line is drawn
+        self.artists[(line, column)][1] = line.generation
+        # Draw the rolling statistics with the color of the column
+        if self.window > 0:
+            stats = line.rolling(column, self.window)
+            if (line, column) not in self.derived:
+                color = self.renderer.color(self.artists[(line, column)][0])
+                self.derived[(line, column)] = [self.renderer.plot([], [], style, color, 1) for style in
+                                               ['--', ':', ':']]
+            for artist, name in zip(self.derived[(line, column)], ['mean', 'low', 'high']):
+                self.renderer.set_data(artist, *decimate(line.data.column(line.header[0]), stats.column(name), xmin,
+                                                         xmax, width))
+
+    # Flag the plotted columns whose rolling mean changed less than the threshold over the last window
+    def show_convergence(self):
+        if self.window <= 0 or self.threshold <= 0:
+            return
+        converged = [column for (line, column) in self.derived if line.rolling(column, self.window).converged(
+            self.threshold)]
+        self.renderer.title('Converged: ' + ', '.join(converged) if converged else '', 'green')
+
+    # Clear the plotted lines and axes
+    def clear_axes(self):
+        self.renderer.clear()
+        self.artists = {}
+        self.derived = {}
+        self.decimatedView = (-np.inf, np.inf)
+
+    # Decimate the plotted lines again for the new view, so that zooming in shows the full resolution data
+    # While the view follows the data the lines are decimated over all their rows, so a range which only grew with
+    # the data (the rescale of every refresh) changes nothing and plot_column redraws only the refreshed lines
+    def xlim_changed(self):
+        view = (-np.inf, np.inf) if self.renderer.autoscaled() else tuple(self.renderer.view())
+        if view == self.decimatedView:
+            return
+        self.decimatedView = view
+        xmin, xmax = view
+        width = self.renderer.width()
+        for (line, column), (artist, generation) in self.artists.items():
+            self.renderer.set_data(artist, *decimate(line.data.column(line.header[0]), line.data.column(column), xmin,
+                                                     xmax, width))
+        for (line, column), artists in self.derived.items():
+            stats = line.rolling(column, self.window)
+            for artist, name in zip(artists, ['mean', 'low', 'high']):
+                self.renderer.set_data(artist, *decimate(line.data.column(line.header[0]), stats.column(name), xmin,
+                                                         xmax, width))
+        # Read the older rows of the lines following the tail once the user views the time before their first row
+        if not self.renderer.autoscaled():
+            for line in {x[0] for x in self.artists}:
+                if line.partial and len(line.data) and xmin < line.data.column(line.header[0])[0]:
+                    self.fetch_history(line)
+        self.renderer.draw(idle=True)
+
+    # Read all the rows of a line following the tail in the background, and replot once they are read
+    def fetch_history(self, line):
+        if line in self.historyRequests:
+            return
+        self.historyRequests.add(line)
+
+        def finished(state):
+            self.historyRequests.discard(line)
+            line.apply(state)
+            self.trim_lines()
+            self.re_plot_data()
+
+        self.load(line.load_history, (), finished)
 
     # Function to connect the file combo box options to the plot application
+    @foamTrace.traced('field_changed')
     def field_changed(self, field):
-        print('FIELD CHANGED')
-        field_changed_start = time.time()
-
         self.field = field  # @@@ Is there a way to eliminate this line?
-        self.read_data()  # Call for read_data()
         # Clear column combo box options
         self.columnCombo.clear()
+        self.read_data(self.field_loaded)  # Call for read_data()
+
+    # Function to fill the column combo box once the selected field is read
+    def field_loaded(self):
+        # The columns of wide files (e.g. thousands of probes) are picked by typing a part of their name
+        self.columnCombo.setEditable(self.line_x.wide)
+        if self.line_x.wide:
+            self.columnCombo.setInsertPolicy(QComboBox.NoInsert)
+            self.columnCombo.completer().setCompletionMode(QCompleter.PopupCompletion)
+            self.columnCombo.completer().setFilterMode(Qt.MatchContains)
+            self.columnCombo.completer().setCaseSensitivity(Qt.CaseInsensitive)
+            self.columnCombo.lineEdit().setPlaceholderText('Filter ' + str(len(self.line_x.header) - 1) + ' columns')
         # Add new options to the column combo box
-        for column in range(1, len(self.line_x.data.columns)):
-            self.columnCombo.addItem(self.line_x.data.columns[column])
+        self.columnCombo.addItems(self.line_x.header[1:])
         # Declare column combo box initial option as undefined
         self.columnCombo.setCurrentIndex(-1)
 
-        field_changed_end = time.time()
-        print('FIELD CHANGED time = ' + str(field_changed_end - field_changed_start))
-
     # Function to connect the column combo box options to the plot application
+    @foamTrace.traced('column_changed')
     def column_changed(self, column):
-        print('COLUMN CHANGED')
-        column_changed_start = time.time()
-
+        # Ignore filter texts which do not name a column
+        if column not in self.line_x.header[1:]:
+            return
         self.column = column  # @@@ Is there a way to eliminate this line?
         self.plot_data()  # Call for plot_data()
 
-        column_changed_end = time.time()
-        print('COLUMN CHANGED time = ' + str(column_changed_end - column_changed_start))
-
-    # Function to reread the last valid time file and append only the new results
-    def re_read_data(self, tail):
-        print('RE_READ DATA')
-        re_read_data_start = time.time()
-
-        self.line_x.re_read_data(tail)
-
-        re_read_data_end = time.time()
-        print('RE_READ time = ' + str(re_read_data_end - re_read_data_start))
-
     # Replot all lines that were already plotted
+    @foamTrace.traced('re_plot_data')
     def re_plot_data(self):
-        print('RE_PLOT DATA')
-        re_plot_data_start = time.time()
-
-        # Clear the plotted lines and axes
-        self.ax.cla()
-        # Loop over all lines and find which columns were plotted (and plot them)
+        # Loop over all lines and find which columns were plotted (and update their artists)
+        plotted = []
         for x in self.line:
             print('plotted columns = ' + str(x.plottedColumns))
             if sum(x.plottedColumns) > 0:
                 for y in range(len(x.plottedColumns)):
                     if x.plottedColumns[y]:
-                        # Actual plot commands
-                        x.data.plot(x=x.header[0], y=x.header[y], ax=self.ax, legend=False, grid=True)
+                        plotted.append((x, x.header[y]))
+                        # Apply only to lines whose data changed since they were drawn
+                        if self.artists.get((x, x.header[y]), [None, None])[1] != x.generation:
+                            self.plot_column(x, x.header[y])
+                            print('Line: ' + str(self.line.index(x)) + ' - Column: ' + str(y) + ' was replotted.')
                         # Define labels
-                        self.ax.set_ylabel(x.field + ' - Column: ' + x.header[y])
-                        self.ax.set_xlabel(x.header[1])
-                        print('Line: ' + str(self.line.index(x)) + ' - Column: ' + str(y) + ' was replotted.')
+                        self.renderer.labels(x.header[1], x.field + ' - Column: ' + x.header[y])
                         # Indicate the column as plotted
                         x.is_plotted(y, 1)
-        # Declare tight limits and trigger the draw
-        plt.tight_layout()
-        self.fig.canvas.draw()
-
-        re_plot_data_end = time.time()
-        print('RE_PLOT DATA time = ' + str(re_plot_data_end - re_plot_data_start))
+        # Remove the artists of columns that are no longer plotted
+        for key in [x for x in self.artists if x not in plotted]:
+            self.renderer.remove(self.artists.pop(key)[0])
+            [self.renderer.remove(x) for x in self.derived.pop(key, [])]
+        self.show_convergence()
+        # Rescale to the new data, the view is kept if the user zoomed or panned (autoscaling is off then)
+        self.renderer.rescale()
+        # Let Qt coalesce the draws while the automatic refresher is on
+        self.renderer.draw(idle=bool(self.checkBox.checkState()))
 
     # Function to automatically update the plot data once a watched file modification is triggered
-    # It is also connected to the
+    # It is also connected to the update plot button
+    @foamTrace.traced('update_plot')
     def update_plot(self):
-        print('UPDATE PLOT')
-        update_plot_start = time.time()
+        # Apply only when no refresh is running (the pending changes are picked up once it finishes)
+        if self.refresher is not None:
+            return
 
+        # Lines with new times are read again (args of Line.load)
+        tasks = {}
         for x in self.updateTimesList:
-            # Update the Line key variables
-            (self.maindir, self.folder, self.field) = (x.maindir, x.folder, x.field)
-            self.read_data()  # Call for read_data()
-
+            # Evicted lines are read with all their times once they are selected again
+            if x.data is None:
+                continue
+            tasks[x] = (x.maindir, x.folder, x.field, self.case_index(x.maindir).times(x.folder, x.field))
         # Loop over all modified files and find to which lines they belong (and read/re_read their data)
+        # The series of a solver log share its file, the first tail parses the new content for all of them
         for path in self.modifiedFiles:
-            # Create a flag to break out of the middle loop
-            flag = False
-            for x in range(len(self.line)):
-                for y in self.line[x].fileList:
-                    if path == y:
-                        self.line_x = self.line[x]
-                        # Compute how many lines were added to the file
-                        tail = len(open(path).readlines()) - 1 - self.line[x].rows2skip - self.line[x].height
-                        if tail > 0 and path == self.line[x].fileList[-1]:
-                            self.re_read_data(tail)  # Call for reread_data()
-                        else:
-                            # Update the Line key variables
-                            (self.maindir, self.folder, self.field, self.timeNames) = \
-                                (self.line[x].maindir, self.line[x].folder, self.line[x].field, self.line[x].timeNames)
-                            self.read_data()  # Call for read_data()
-                        # Activate break flag and break out of the inner loop
-                        flag = True
-                        break
-                # Break out of the middle loop
-                if flag:
-                    break
+            for x in self.line:
+                if path in x.fileList:
+                    # Only the last time file grows, so parse just its new bytes (args=None)
+                    if path == x.fileList[-1]:
+                        tasks.setdefault(x, None)
+                    else:
+                        tasks[x] = (x.maindir, x.folder, x.field, x.timeNames)
         print('Modified file list = ' + str(self.modifiedFiles))
-        # Re_add the modified files to the watcher list
-        self.watcher.addPaths(self.modifiedFiles)
-        # Reset the modified files list
+        # Reset the modified files and times lists
         self.modifiedFiles = []
-        self.re_plot_data()  # Call for re_plot_data()
+        self.updateTimesList = []
         # Set button state to disabled
         self.updatePlotButton.setEnabled(False)
 
-        update_plot_end = time.time()
-        print('UPDATE PLOT time = ' + str(update_plot_end - update_plot_start))
-
-    # Function to create a list of modified files and trigger the start of the timer
-    # This function was required to deal with the multiple event triggers when several
-    # files are modified simultaneously. To trigger the read_data and plot_data functions
-    # only once the files must be changed and added within the stipulated time interval.
+        self.refreshStart = foamTrace.now()
+        self.refresher = self.load(load_lines, (list(tasks.items()),), self.refresh_finished)
+
+    # Function to apply the refreshed data and replot
+    def refresh_finished(self, states):
+        for line, generation, state in states:
+            # Discard results computed from an older state of the line and read them again: a tail would be appended
+            # twice, and a full load would drop the columns fetched meanwhile
+            if line.generation != generation:
+                if 'data' not in state:
+                    self.modifiedFiles.append(line.fileList[-1])
+                elif line not in self.updateTimesList:
+                    self.updateTimesList.append(line)
+                continue
+            line.apply(state)
+        # New times move the growing file of a line
+        self.watch_lines()
+        self.trim_lines()
+        self.re_plot_data()  # Call for re_plot_data()
+        # Latency from the refresh request to the replot (reading and parsing included)
+        foamTrace.complete('refresh', self.refreshStart, lines=len(states))
+        # Pick up the changes that arrived during the refresh
+        if self.modifiedFiles or self.updateTimesList:
+            self.file_modification_update_2()
+
+    # Function to add a modified file to the modifiedFiles list
+    # The watcher coalesces the events of files modified simultaneously, so that read_data and plot_data are
+    # triggered only once per change set (see paths_changed)
     def file_modification_update_1(self, path):
-        print('FILE MODIFICATION UPDATE 1')
-        file_modification_update_1_start = time.time()
-
         print('File: ' + str(path) + ' was modified')
         # Apply only to paths which are not currently in the modifiedFiles list
         if path not in self.modifiedFiles:
             self.modifiedFiles.append(path)
-        # Start the single-shot timer for update plot
-        self.timer.start(50)
-
-        file_modification_update_1_end = time.time()
-        print('FILE MODIFICATION UPDATE 1 time = ' + str(
-            file_modification_update_1_end - file_modification_update_1_start))
 
-    # Function to connect the timer timeout with the plot_update function
+    # Function to trigger the plot_update function once the change set was collected
     def file_modification_update_2(self):
-        print('FILE MODIFICATION UPDATE 2')
-        file_modification_update_2_start = time.time()
-
         # Apply only if the automatic refresher is on
         if self.checkBox.checkState():
             # Clear the plotted lines and axes
@@ -512,27 +729,18 @@ class Widget(QWidget):
         else:
             # Set button state to enabled
             self.updatePlotButton.setEnabled(True)
-            # Re_add the modified files to the watcher list
-            self.watcher.addPaths(self.modifiedFiles)
         print('Directories: ' + str(self.watcher.directories()) + ' are being watched')
         print('Files: ' + str(self.watcher.files()) + ' are being watched')
 
-        file_modification_update_2_end = time.time()
-        print('FILE MODIFICATION UPDATE 2 time = ' + str(
-            file_modification_update_2_end - file_modification_update_2_start))
-
     # Function to connect the clear plot button with the plot_clear function
+    @foamTrace.traced('clear_plot')
     def clear_plot(self):
-        print('CLEAR PLOT')
-        clear_plot_start = time.time()
-
         # Clear plotted lines and axes
-        self.ax.cla()
+        self.clear_axes()
         # Apply when no column is currently selected in the column combo box
         if self.columnCombo.currentText() == '':
             # Declare tight limits and trigger the draw
-            plt.tight_layout()
-            self.fig.canvas.draw()
+            self.renderer.draw(layout=True)
             print('No columns are currently selected.')
 
         else:
@@ -549,16 +757,24 @@ class Widget(QWidget):
             self.line_x = self.line[np.where(which_line)[0][0]]
             self.timeNames = self.line_x.timeNames
 
-            # Remove the watch over other field files
-            self.watcher.removePaths(self.watcher.files())
             # Reset all plottedColumn lists
             [self.line[x].reset_plottedColumns() for x in range(len(self.line))]
+            # Remove the watch over other field files
+            self.watch_lines()
+            # Release the memory of the columns which are no longer plotted (the selected one is plotted again)
+            [x.release_columns([self.column] if x is self.line_x else []) for x in self.line]
 
             # Clear plotted lines and axes
             self.plot_data()  # Call for plot_data()
 
-        clear_plot_end = time.time()
-        print('CLEAR PLOT time = ' + str(clear_plot_end - clear_plot_start))
+    # Show the last refresh latency, the last draw time and the parse throughput of the session
+    def update_overlay(self):
+        parse = foamTrace.totals.get('parse', [0, 0.0])[1]
+        throughput = foamTrace.counters.get('bytes_parsed', 0) / parse / 1024 ** 2 if parse else 0.0
+        self.overlayLabel.setText('refresh %7.1f ms\ndraw    %7.1f ms\nparse   %7.1f MB/s\nevents  %7d / %d' % (
+            1000 * foamTrace.latest.get('refresh', 0.0), 1000 * foamTrace.latest.get('draw', 0.0), throughput,
+            foamTrace.counters.get('watcher_events', 0), foamTrace.counters.get('watcher_changes', 0)))
+        self.overlayLabel.adjustSize()
 
     # Print refresh mode
     def checkBox_State(self, state):
@@ -572,15 +788,69 @@ class Widget(QWidget):
 
 # Initialize the application
 if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Plot OpenFOAM postProcessing data')
+    parser.add_argument('--cache-size', type=float, default=1024,
+                        help='size limit of the parsed data cache in MB (default: %(default)s)')
+    parser.add_argument('--no-cache', action='store_true', help='do not cache the parsed data of finished time files')
+    parser.add_argument('--clear-cache', action='store_true', help='remove the parsed data cache and exit')
+    parser.add_argument('--watch', choices=['auto', 'event', 'poll'], default='auto',
+                        help='change detection: kernel events, stat polling or polling only network file systems '
+                             '(default: %(default)s)')
+    parser.add_argument('--trace', metavar='FILE', help='record spans and counters and write them to FILE on exit')
+    parser.add_argument('--trace-format', choices=['chrome', 'json'], default='chrome',
+                        help='Chrome trace (chrome://tracing, Perfetto) or a JSON summary (default: %(default)s)')
+    parser.add_argument('--overlay', action='store_true',
+                        help='show the refresh latency, draw time and parse throughput over the plot')
+    parser.add_argument('--memory-budget', type=float, default=2048,
+                        help='memory for the data of all opened fields in MB, the least recently used unplotted '
+                             'ones are evicted beyond it (default: %(default)s)')
+    parser.add_argument('--window', type=int, default=0,
+                        help='draw the rolling mean -+ standard deviation over this many rows (default: none)')
+    parser.add_argument('--converge', type=float, default=0.0, metavar='THRESHOLD',
+                        help='flag the columns whose rolling mean changed less than THRESHOLD (relative) over the '
+                             'last window (requires --window)')
+    follow = parser.add_mutually_exclusive_group()
+    follow.add_argument('--follow', type=int, default=0, metavar='ROWS',
+                        help='read only the last ROWS rows of the fields, the older ones when the view reaches them')
+    follow.add_argument('--follow-time', type=float, default=0.0, metavar='SPAN',
+                        help='read only the rows of the last SPAN of simulated time, the older ones when the view '
+                             'reaches them')
+    parser.add_argument('--dtype', choices=['float32', 'float64'], default='float64',
+                        help='storage type of the data columns, float32 halves the memory (default: %(default)s)')
+    parser.add_argument('--threads', type=int,
+                        help='threads reading the time files of a field concurrently (default: one per CPU, up to 8)')
+    parser.add_argument('--backend', choices=['matplotlib', 'pyqtgraph'], default='matplotlib',
+                        help='rendering backend, pyqtgraph redraws many refreshing lines faster (default: %(default)s)')
+    args = parser.parse_args()
+
+    if args.clear_cache:
+        from foamData import Line
+        Line.cache.clear()
+        print('Cache ' + Line.cache.directory + ' was cleared')
+        sys.exit()
+    Widget.cacheSize = None if args.no_cache else int(args.cache_size * 1024 ** 2)
+    Widget.dtype = args.dtype
+    Widget.readThreads = args.threads
+    Widget.backend = args.backend
+    Widget.watchMode = args.watch
+    Widget.overlay = args.overlay
+    Widget.memoryBudget = int(args.memory_budget * 1024 ** 2)
+    Widget.window = args.window
+    Widget.threshold = args.converge
+    Widget.followRows = args.follow
+    Widget.followSpan = args.follow_time
+    foamTrace.enable(bool(args.trace) or args.overlay)
+
     app = QApplication([])
     # app.setApplicationName('pp')
     widget = Widget()
     widget.show()
     app.exec()
+    if args.trace:
+        foamTrace.export(args.trace, args.trace_format)
 
 # To do: Fix plot labels and legends when multiple lines are plotted.
 # To do: Check which instance variables can be given as arguments to functions instead (saving memory).
 # To do: Record colors for each column.
 # To do: Add a way to blit the plot, but only if the automatic refresher is on.
-# To do: Add a way to save all of toolbar's configurations when refreshing the plot.
 # To do: Start thinking about adding the PyFoam applications for case setup.